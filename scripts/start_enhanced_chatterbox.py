@@ -48,14 +48,11 @@ def get_enhanced_tts_response(text, agent_type='general', emotion=None):
         audio_bytes, metadata = chatterbox_service.text_to_speech(
             text=text,
             agent_type=agent_type,
-            emotion=emotion
+            emotion=emotion,
+            twilio_optimized=os.getenv('OPTIMIZE_FOR_TWILIO', 'true').lower() == 'true'
         )
         
         if audio_bytes and len(audio_bytes) > 0:
-            # Optimize for Twilio
-            if os.getenv('OPTIMIZE_FOR_TWILIO', 'true').lower() == 'true':
-                audio_bytes = chatterbox_service.optimize_for_twilio(audio_bytes)
-            
             print(f"✅ Generated {len(audio_bytes)} bytes with {metadata.get('emotion', 'neutral')} emotion")
             return audio_bytes
         else:
@@ -47,6 +47,14 @@ def create_app(config_name=None): # config_name can be 'testing', 'development',
             if database_url.startswith('postgres://'): # For Heroku/Render compatibility
                 database_url = database_url.replace('postgres://', 'postgresql://', 1)
             app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+            # Size the pool for concurrent calls (each CallSession commits on its own)
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+                'pool_size': int(os.getenv('DB_POOL_SIZE', '20')),
+                'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '40')),
+                'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '5')),
+                'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+                'pool_pre_ping': True,
+            }
         else:
             # Default development database (SQLite file)
             db_dir = os.path.join(os.path.dirname(__file__), 'database')
@@ -77,6 +85,23 @@ def create_app(config_name=None): # config_name can be 'testing', 'development',
     app.register_blueprint(customer_bp, url_prefix='/api')
     app.register_blueprint(reports_bp, url_prefix='/api')
 
+    # Warm the router's agent configs and keyword index so call setup only
+    # waits on the customer lookup, not a cold config load
+    if not app.config['TESTING']:
+        with app.app_context():
+            from src.services.call_router import call_router
+            call_router.warm_up()
+
+    # Load Chatterbox and prime its kernels once per worker before traffic arrives
+    if not app.config['TESTING'] and os.getenv('USE_CHATTERBOX', 'false').lower() == 'true':
+        from src.services.chatterbox_service import chatterbox_service
+        chatterbox_service.warmup()
+
+    # End call sessions left behind by dropped calls (no final status webhook)
+    if not app.config['TESTING']:
+        from src.services.call_session import session_manager
+        session_manager.start_reaper(app)
+
     # Define the catch-all route for serving static files or index.html
     # This needs to be defined on the app instance created by create_app
     @app.route('/', defaults={'path': ''})
@@ -99,8 +99,11 @@ def validate_basic_auth(f):
         if not username or not password:
             return f(*args, **kwargs)
         
-        # Validate credentials
-        if not auth or not (auth.username == username and auth.password == password):
+        # Validate credentials using constant-time comparison
+        if not auth or not (
+            hmac.compare_digest((auth.username or '').encode('utf-8'), username.encode('utf-8'))
+            and hmac.compare_digest((auth.password or '').encode('utf-8'), password.encode('utf-8'))
+        ):
             logger.warning("Invalid basic auth credentials")
             return jsonify({'error': 'Authentication required'}), 401
         
@@ -162,6 +162,7 @@ class DatabaseManager:
                 self._populate_default_data()
                 
                 self.models_loaded = True
+                logger.info("Database connection pool: %s", self.db.engine.pool.status())
                 return True
                 
             except Exception as e:
@@ -7,6 +7,7 @@ from sqlalchemy import or_, and_
 from src.models.customer import Customer, Tag, db
 from src.models.call import Call, SMSLog
 from src.services.auth import jwt_required
+from src.services.customer_cache import customer_id_cache
 
 logger = logging.getLogger(__name__)
 
@@ -170,8 +171,10 @@ def delete_customer(customer_id):
         
         # Note: This will not delete calls/SMS due to foreign key constraints
         # Consider soft delete or archiving instead
+        phone_number = customer.phone_number
         db.session.delete(customer)
         db.session.commit()
+        customer_id_cache.invalidate(phone_number)
         
         return '', 204
         
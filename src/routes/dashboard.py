@@ -44,7 +44,7 @@ def get_dashboard_metrics():
         }
         
         # Get active calls (from session manager)
-        active_calls = len(session_manager.get_active_sessions())
+        active_calls = session_manager.active_session_count()
         
         # Get average call duration
         avg_duration = db.session.query(
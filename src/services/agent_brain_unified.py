@@ -6,8 +6,9 @@ import logging
 import json
 import time
 from typing import Dict, Any, List, Optional, Tuple
-from datetime import datetime
+from datetime import datetime, timezone
 from collections import deque
+from itertools import islice
 import openai
 from sqlalchemy.orm import Session
 
@@ -26,7 +27,7 @@ class ConversationState:
     
     def __init__(self, call_sid: str):
         self.call_sid = call_sid
-        self.started_at = datetime.utcnow()
+        self.started_at = datetime.now(timezone.utc)
         self.turn_count = 0
         self.context = {}  # Key facts mentioned
         self.intents = []  # Detected intents
@@ -420,8 +421,9 @@ Response format: JSON only"""
                 "content": "The user interrupted you. Acknowledge briefly and address their concern immediately."
             })
         
-        # Add conversation history with better formatting
-        for i, msg in enumerate(conversation_history[-10:]):  # Last 10 turns
+        # Add conversation history with better formatting (list or bounded deque)
+        recent_history = islice(conversation_history, max(len(conversation_history) - 10, 0), None)
+        for i, msg in enumerate(recent_history):  # Last 10 turns
             role = "user" if i % 2 == 0 else "assistant"
             messages.append({"role": role, "content": msg})
         
@@ -2,11 +2,15 @@
 JWT Authentication Service
 """
 import os
+import json
 import logging
-from datetime import datetime, timedelta
+from calendar import timegm
+from datetime import datetime, timedelta, timezone
 from functools import wraps
 import jwt
 from flask import request, jsonify, current_app
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from werkzeug.security import generate_password_hash, check_password_hash
 from src.models.user import User, db
 
@@ -18,13 +22,42 @@ JWT_ALGORITHM = 'HS256'
 JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
 JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
 
+# Precomputed HS256 signer: the algorithm object, prepared key and encoded
+# header are constant, so build them once instead of on every jwt.encode call
+try:
+    from jwt.algorithms import HMACAlgorithm
+    from jwt.utils import base64url_encode
+
+    _JWT_SIGNER = HMACAlgorithm(HMACAlgorithm.SHA256)
+    _JWT_SIGNING_KEY = _JWT_SIGNER.prepare_key(JWT_SECRET_KEY)
+    _JWT_HEADER_SEGMENT = base64url_encode(
+        json.dumps({'alg': JWT_ALGORITHM, 'typ': 'JWT'}, separators=(',', ':')).encode('utf-8')
+    )
+except (ImportError, AttributeError):
+    _JWT_SIGNER = None
+
+
+def _encode_token(payload):
+    """Encode an HS256 JWT with the cached signer, falling back to jwt.encode"""
+    if _JWT_SIGNER is None:
+        return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+
+    claims = {
+        key: timegm(value.utctimetuple()) if isinstance(value, datetime) else value
+        for key, value in payload.items()
+    }
+    payload_segment = base64url_encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    signing_input = _JWT_HEADER_SEGMENT + b'.' + payload_segment
+    signature = _JWT_SIGNER.sign(signing_input, _JWT_SIGNING_KEY)
+    return (signing_input + b'.' + base64url_encode(signature)).decode('ascii')
+
 class AuthService:
     """Authentication service for JWT token management"""
     
     @staticmethod
     def generate_tokens(user_id):
         """Generate access and refresh tokens"""
-        now = datetime.utcnow()
+        now = datetime.now(timezone.utc)
         
         # Access token payload
         access_payload = {
@@ -42,8 +75,8 @@ class AuthService:
             'exp': now + JWT_REFRESH_TOKEN_EXPIRES
         }
         
-        access_token = jwt.encode(access_payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
-        refresh_token = jwt.encode(refresh_payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+        access_token = _encode_token(access_payload)
+        refresh_token = _encode_token(refresh_payload)
         
         return {
             'access_token': access_token,
@@ -67,7 +100,7 @@ class AuthService:
             logger.warning("Token has expired")
             return None
         except jwt.InvalidTokenError as e:
-            logger.warning(f"Invalid token: {e}")
+            logger.warning("Invalid token: %s", e)
             return None
     
     @staticmethod
@@ -86,11 +119,13 @@ class AuthService:
     @staticmethod
     def create_user(username, email, password, role='user'):
         """Create a new user"""
-        # Check if user already exists
-        if User.query.filter_by(username=username).first():
-            raise ValueError("Username already exists")
-        
-        if User.query.filter_by(email=email).first():
+        # Check if user already exists (single round-trip for both fields)
+        existing = db.session.query(User.username, User.email).filter(
+            or_(User.username == username, User.email == email)
+        ).first()
+        if existing:
+            if existing.username == username:
+                raise ValueError("Username already exists")
             raise ValueError("Email already exists")
         
         # Create new user
@@ -102,35 +137,48 @@ class AuthService:
         user.set_password(password)
         
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Unique constraints on username/email catch concurrent signups
+            db.session.rollback()
+            raise ValueError("Username or email already exists")
         
         return user
 
+def _authenticate_request():
+    """Resolve the current user from the bearer token, or return an error response"""
+    # Get token from header
+    auth_header = request.headers.get('Authorization', '')
+    
+    if not auth_header.startswith('Bearer '):
+        return None, (jsonify({'error': 'Missing or invalid authorization header'}), 401)
+    
+    token = auth_header.split(' ', 1)[1]
+    
+    # Verify token
+    payload = AuthService.verify_token(token)
+    if not payload:
+        return None, (jsonify({'error': 'Invalid or expired token'}), 401)
+    
+    # Get user
+    user = User.query.get(payload['user_id'])
+    if not user:
+        return None, (jsonify({'error': 'User not found'}), 401)
+    
+    # Add user to request context
+    request.current_user = user
+    
+    return user, None
+
 # Decorator for JWT authentication
 def jwt_required(f):
     """Decorator to require valid JWT token"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # Get token from header
-        auth_header = request.headers.get('Authorization', '')
-        
-        if not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Missing or invalid authorization header'}), 401
-        
-        token = auth_header.split(' ', 1)[1]
-        
-        # Verify token
-        payload = AuthService.verify_token(token)
-        if not payload:
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        
-        # Get user
-        user = User.query.get(payload['user_id'])
-        if not user:
-            return jsonify({'error': 'User not found'}), 401
-        
-        # Add user to request context
-        request.current_user = user
+        user, error = _authenticate_request()
+        if error:
+            return error
         
         return f(*args, **kwargs)
     
@@ -139,11 +187,17 @@ def jwt_required(f):
 # Decorator for role-based access control
 def role_required(*allowed_roles):
     """Decorator to require specific user roles"""
+    allowed = frozenset(allowed_roles)
+    
     def decorator(f):
+        # Authentication and role check share one wrapper (no stacked jwt_required)
         @wraps(f)
-        @jwt_required
         def decorated_function(*args, **kwargs):
-            if request.current_user.role not in allowed_roles:
+            user, error = _authenticate_request()
+            if error:
+                return error
+            
+            if user.role not in allowed:
                 return jsonify({'error': 'Insufficient permissions'}), 403
             return f(*args, **kwargs)
         return decorated_function
@@ -3,12 +3,19 @@ Smart Call Routing Service - Intelligent agent selection based on caller intent
 """
 import os
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from abc import ABC, abstractmethod
 from src.models.call import AgentConfig, db
 
 logger = logging.getLogger(__name__)
 
+# Agent config fields that may be updated directly through update_agent_config
+_ALLOWED_UPDATE_FIELDS = frozenset({
+    'name', 'description', 'system_prompt', 'max_turns',
+    'timeout_seconds', 'voice_provider', 'voice_model',
+    'priority', 'sms_template'
+})
+
 class AgentConfigProvider(ABC):
     """
     Abstract base class for agent configuration providers.
@@ -67,9 +74,9 @@ class SQLAgentConfigProvider(AgentConfigProvider):
         try:
             configs = AgentConfig.query.all()
             self.agent_configs = {config.agent_type: config for config in configs}
-            logger.info(f"Loaded {len(self.agent_configs)} agent configurations")
+            logger.info("Loaded %s agent configurations", len(self.agent_configs))
         except Exception as e:
-            logger.error(f"Error loading agent configs: {e}")
+            logger.error("Error loading agent configs: %s", e)
             self.agent_configs = {}
 
     def get_agent_config(self, agent_type: str) -> Optional[AgentConfig]:
@@ -97,25 +104,24 @@ class SQLAgentConfigProvider(AgentConfigProvider):
             if not config:
                 return False
 
-            allowed_fields = [
-                'name', 'description', 'system_prompt', 'max_turns',
-                'timeout_seconds', 'voice_provider', 'voice_model',
-                'priority', 'sms_template'
-            ]
-
             for field, value in updates.items():
-                if field in allowed_fields and hasattr(config, field):
+                if field in _ALLOWED_UPDATE_FIELDS and hasattr(config, field):
                     setattr(config, field, value)
                 elif field == 'keywords':
                     config.set_keywords(value)
 
             db.session.commit()
             self.load_agent_configs()
-            logger.info(f"Updated agent configuration for {agent_type}")
+
+            # SMS follow-ups cache agent templates; pick up the change right away
+            from src.services.sms_service import sms_service
+            sms_service.invalidate_agent_config(agent_type)
+
+            logger.info("Updated agent configuration for %s", agent_type)
             return True
 
         except Exception as e:
-            logger.error(f"Error updating agent config: {e}")
+            logger.error("Error updating agent config: %s", e)
             db.session.rollback()
             return False
 
@@ -151,6 +157,62 @@ class CallRouter:
         # Ensure configs are loaded
         self.agent_config_provider.load_agent_configs()
 
+        # Keyword index derived from the loaded configs (rebuilt when they are reloaded),
+        # published as one (source configs, index, remaining budget, exact map) tuple
+        # so a concurrent rebuild can never mix parts of two generations
+        self._index_snapshot: Tuple[Any, ...] = (None, (), (0,), {})
+
+    def load_agent_configs(self) -> None:
+        """
+        (Re)load agent configurations so routing runs from memory on the call path
+        """
+        self.agent_config_provider.load_agent_configs()
+
+    def warm_up(self) -> None:
+        """
+        Load agent configurations and build the keyword index ahead of the first call
+        """
+        self.load_agent_configs()
+        self._ensure_keyword_index(self.agent_config_provider.get_all_agent_configs())
+
+    def _ensure_keyword_index(self, agent_configs: Dict[str, AgentConfig]) -> Tuple[Any, ...]:
+        """
+        Return the keyword index snapshot for the current agent configs, building it if needed.
+
+        The snapshot is (agent_configs, index, remaining_budget, exact_map).
+
+        Entries are (weight, keyword_lower, agent_type, position) sorted by
+        weight descending, where weight is len(keyword) * priority.
+        remaining_budget[i] bounds the score any agent can still gain from
+        entries i onwards (keyword weight plus the per-keyword multi-match
+        bonus, plus the one-off bonus for a first keyword becoming two).
+        """
+        snapshot = self._index_snapshot
+        if snapshot[0] is agent_configs:
+            return snapshot
+
+        index = []
+        exact_map: Dict[str, List[str]] = {}
+        for agent_type, config in agent_configs.items():
+            for position, keyword in enumerate(config.get_keywords()):
+                keyword_lower = keyword.lower()
+                index.append((len(keyword) * config.priority, keyword_lower, agent_type, position))
+                exact_map.setdefault(keyword_lower, []).append(agent_type)
+        index.sort(key=lambda entry: entry[0], reverse=True)
+
+        remaining_budget = [2] * (len(index) + 1)
+        for i in range(len(index) - 1, -1, -1):
+            remaining_budget[i] = remaining_budget[i + 1] + index[i][0] + 2
+
+        snapshot = (
+            agent_configs,
+            tuple(index),
+            tuple(remaining_budget),
+            {keyword: tuple(agents) for keyword, agents in exact_map.items()}
+        )
+        self._index_snapshot = snapshot
+        return snapshot
+
     def analyze_intent(self, user_input: str) -> Dict[str, Any]:
         """
         Analyze user input to determine best agent match
@@ -166,39 +228,67 @@ class CallRouter:
         # TODO: Pluginize the intent analyzer and keyword matcher to decouple rules/AI intent logic
         # This is where a plugin registry or MCP hook could be invoked to analyze intent
 
-        # Score each agent based on keyword matches
-        agent_scores = []
+        # Work from one snapshot throughout, even if another request reloads the configs
+        agent_configs, keyword_index, remaining_budget, exact_map = self._ensure_keyword_index(
+            self.agent_config_provider.get_all_agent_configs()
+        )
 
-        agent_configs = self.agent_config_provider.get_all_agent_configs()
+        # Exact phrase owned by a single agent is an unambiguous match
+        exact_agents = exact_map.get(user_input_lower, ())
+        if len(set(exact_agents)) == 1:
+            agent_type = exact_agents[0]
+            config = agent_configs[agent_type]
+            return {
+                'agent_type': agent_type,
+                'confidence': 1.0,
+                'matched_keywords': [
+                    keyword for keyword in config.get_keywords()
+                    if keyword.lower() in user_input_lower
+                ],
+                'config': config
+            }
 
-        for agent_type, config in agent_configs.items():
-            score = 0
-            matched_keywords = []
-            keywords = config.get_keywords()
-
-            # Check for keyword matches
-            for keyword in keywords:
-                if keyword.lower() in user_input_lower:
-                    # Weight by keyword specificity and agent priority
-                    keyword_weight = len(keyword) * config.priority
-                    score += keyword_weight
-                    matched_keywords.append(keyword)
-
-            # Bonus for multiple keyword matches
-            if len(matched_keywords) > 1:
-                score += len(matched_keywords) * 2
-
-            # Bonus for exact phrase matches
-            for keyword in keywords:
-                if keyword.lower() == user_input_lower:
-                    score += 50  # High bonus for exact match
+        # Score each agent based on keyword matches
+        base_scores: Dict[str, int] = {}
+        matches: Dict[str, List[Tuple[int, str]]] = {}
+        exact_bonus: Dict[str, int] = {}
+        for agent_type in exact_agents:
+            exact_bonus[agent_type] = exact_bonus.get(agent_type, 0) + 50  # High bonus for exact match
+
+        def current_score(agent_type: str) -> int:
+            matched_count = len(matches.get(agent_type, ()))
+            multi_bonus = matched_count * 2 if matched_count > 1 else 0
+            return base_scores.get(agent_type, 0) + multi_bonus + exact_bonus.get(agent_type, 0)
+
+        leader = None
+        for i, (weight, keyword_lower, agent_type, position) in enumerate(keyword_index):
+            if leader is not None and agent_type != leader:
+                continue
+            if keyword_lower not in user_input_lower:
+                continue
+
+            # Weight by keyword specificity and agent priority
+            base_scores[agent_type] = base_scores.get(agent_type, 0) + weight
+            matches.setdefault(agent_type, []).append((position, keyword_lower))
+
+            if leader is None:
+                # Once the best agent cannot be caught, only its own keywords matter
+                candidates = base_scores.keys() | exact_bonus.keys()
+                scores = sorted((current_score(a) for a in candidates), reverse=True)
+                runner_up = scores[1] if len(scores) > 1 else 0
+                if scores[0] > runner_up + remaining_budget[i + 1]:
+                    leader = max(candidates, key=current_score)
 
+        agent_scores = []
+        for agent_type, config in agent_configs.items():
+            score = current_score(agent_type)
             if score > 0:
+                keywords = config.get_keywords()
                 agent_scores.append({
                     'agent_type': agent_type,
                     'config': config,
                     'score': score,
-                    'matched_keywords': matched_keywords
+                    'matched_keywords': [keywords[position] for position, _ in sorted(matches.get(agent_type, ()))]
                 })
 
         # Sort by score (highest first)
@@ -277,7 +367,7 @@ class CallRouter:
             'initial_input': user_input
         }
 
-        logger.info(f"Routed call {call_sid} to {routing_analysis['agent_type']} agent (confidence: {routing_analysis['confidence']:.2f})")
+        logger.info("Routed call %s to %s agent (confidence: %.2f)", call_sid, routing_analysis['agent_type'], routing_analysis['confidence'])
 
         return routing_decision
 
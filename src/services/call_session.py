@@ -3,21 +3,102 @@ Call Session Management - Per-call state isolation for concurrent calls
 """
 import os
 import logging
+import queue
 import threading
-from datetime import datetime
+import time
+from collections import deque
+from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any, Callable
+from flask import current_app, has_app_context
 from src.services.agent_brain_unified import agent_brain
 from src.services.call_router import call_router
+from src.services.customer_cache import customer_id_cache
 from src.models.call import Call, Message, db
 from src.models.customer import Customer
 
 logger = logging.getLogger(__name__)
 
+class BackgroundDBWriter:
+    """
+    Runs database write jobs on background threads, off the voice-response path.
+
+    Jobs are sharded by key (call_sid) onto single-writer queues so writes for
+    one call are applied in order while different calls proceed in parallel.
+    """
+
+    def __init__(self, shards: int = 4):
+        self._queues = [queue.Queue() for _ in range(shards)]
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._started:
+            return
+        with self._start_lock:
+            if self._started:
+                return
+            for index, job_queue in enumerate(self._queues):
+                thread = threading.Thread(
+                    target=self._run,
+                    args=(job_queue,),
+                    name=f"call-db-writer-{index}",
+                    daemon=True
+                )
+                thread.start()
+            self._started = True
+
+    def _queue_for(self, key: str) -> queue.Queue:
+        return self._queues[hash(key) % len(self._queues)]
+
+    def submit(self, key: str, job: Callable[[], None]):
+        """
+        Queue a write job behind any earlier jobs for the same key
+        """
+        self._ensure_started()
+        self._queue_for(key).put(job)
+
+    def flush(self, key: str, timeout: Optional[float] = 5.0) -> bool:
+        """
+        Block until every job queued so far for this key has run
+        """
+        if not self._started:
+            return True
+        done = threading.Event()
+        self._queue_for(key).put(done)
+        return done.wait(timeout)
+
+    @staticmethod
+    def _run(job_queue: queue.Queue):
+        while True:
+            job = job_queue.get()
+            try:
+                if isinstance(job, threading.Event):
+                    job.set()
+                else:
+                    job()
+            except Exception as e:
+                logger.error("Background database write failed: %s", e)
+            finally:
+                job_queue.task_done()
+
 class CallSession:
     """
     Isolated session for each call to prevent cross-call interference
     """
 
+    # Conversation messages are persisted in batches of this many rows
+    MESSAGE_FLUSH_EVERY = 4
+    MESSAGE_WRITE_ATTEMPTS = 3
+    MESSAGE_RETRY_DELAY = 0.2  # seconds, multiplied by the attempt number
+
+    # Only the most recent turns are sent to the LLM each turn
+    KEEP_TURNS = 6
+
+    # Calls shorter than this, or ending with one of these statuses, get a
+    # canned summary instead of an LLM round-trip
+    MIN_TURNS_FOR_SUMMARY = 2
+    NO_SUMMARY_STATUSES = frozenset({'abandoned', 'busy', 'failed', 'no-answer'})
+
     def __init__(
         self,
         call_sid: str,
@@ -27,10 +108,12 @@ class CallSession:
         twilio_phone_number: str,
         db_session=None,
         customer_finder: Optional[Callable[[str], Any]] = None,
+        db_writer: Optional[BackgroundDBWriter] = None,
     ):
         self.call_sid = call_sid
         self.phone_number = phone_number
-        self.created_at = datetime.utcnow()
+        self.created_at = datetime.now(timezone.utc)
+        self._created_monotonic = time.monotonic()
 
         # Injected dependencies
         self.agent_brain = agent_brain
@@ -38,31 +121,46 @@ class CallSession:
         self.db_session = db_session if db_session is not None else db.session
         self.customer_finder = customer_finder if customer_finder is not None else self.default_customer_finder
         self.twilio_phone_number = twilio_phone_number
+        self.db_writer = db_writer
 
         # Call-specific state
-        self.conversation_history = []
         self.agent_config = None
         self.agent_type = 'general'
         self.routing_confidence = 0.0
         self.matched_keywords = []
         self.turn_count = 0
         self.max_turns = 20
+        # Bounded to user/assistant pairs for max_turns; resized once routing is known
+        self.conversation_history = deque(maxlen=self.max_turns * 2)
+        # Sliding window of recent user/assistant messages passed to the agent brain
+        self._live_context = deque(maxlen=self.KEEP_TURNS * 2)
 
         # Call tracking
         self.call_record = None
         self.is_active = True
+        # Message rows queued for a Core executemany insert (no ORM unit of work)
+        self._pending_messages: List[Dict[str, Any]] = []
 
-        logger.info(f"Created isolated call session for {call_sid}")
+        logger.info("Created isolated call session for %s", call_sid)
 
     def default_customer_finder(self, phone_number: str):
         """
         Default customer finder/creator function
         """
+        # Repeat callers resolve through a primary-key lookup instead of a phone query
+        cached_id = customer_id_cache.get(phone_number)
+        if cached_id is not None:
+            customer = self.db_session.get(Customer, cached_id)
+            if customer:
+                return customer
+            customer_id_cache.invalidate(phone_number)
+
         customer = Customer.query.filter_by(phone_number=phone_number).first()
         if not customer:
             customer = Customer(phone_number=phone_number)
             self.db_session.add(customer)
             self.db_session.commit()
+        customer_id_cache.set(phone_number, customer.id)
         return customer
 
     def route_call(self, initial_input: str) -> Dict[str, Any]:
@@ -82,6 +180,7 @@ class CallSession:
             self.routing_confidence = routing_decision['confidence']
             self.matched_keywords = routing_decision['matched_keywords']
             self.max_turns = routing_decision.get('max_turns', 20)
+            self.conversation_history = deque(self.conversation_history, maxlen=self.max_turns * 2)
 
             # Configure the agent brain for this specific call
             self.agent_brain.set_agent_instructions(routing_decision['system_prompt'])
@@ -109,12 +208,12 @@ class CallSession:
 
             # TODO: Plugin hook for metrics and routing analytics
 
-            logger.info(f"Call {self.call_sid} routed to {self.agent_type} agent (confidence: {self.routing_confidence:.2f})")
+            logger.info("Call %s routed to %s agent (confidence: %.2f)", self.call_sid, self.agent_type, self.routing_confidence)
 
             return routing_decision
 
         except Exception as e:
-            logger.error(f"Error routing call {self.call_sid}: {e}")
+            logger.error("Error routing call %s: %s", self.call_sid, e)
             # Fallback to general agent
             self.agent_type = 'general'
             self.agent_brain.set_agent_instructions(
@@ -135,47 +234,123 @@ class CallSession:
             if self.turn_count >= self.max_turns:
                 return "Thank you for calling A Killion Voice. I need to end this call now, but please feel free to call back if you need more assistance."
 
-            # Add user input to conversation history
+            # Add user input to conversation history and the live context window
             self.conversation_history.append(user_input)
+            self._live_context.append(user_input)
+
+            # Queue the user row before the LLM call so a full batch is written
+            # on the background writer while the response is generated
+            self._queue_message('user', user_input)
 
-            # Generate AI response using this call's agent brain
+            # Generate AI response using this call's agent brain; the prompt only
+            # carries the live window so its size stays flat over long calls
             ai_response = self.agent_brain.process_conversation(
                 user_input,
-                self.conversation_history
+                self._live_context
             )
 
             # Add AI response to conversation history
             self.conversation_history.append(ai_response)
+            self._live_context.append(ai_response)
 
-            # Save conversation turn to database
-            user_message = Message(
-                call_id=self.call_record.id if self.call_record else None,
-                role='user',
-                content=user_input
-            )
-
-            assistant_message = Message(
-                call_id=self.call_record.id if self.call_record else None,
-                role='assistant',
-                content=ai_response
-            )
-
-            self.db_session.add(user_message)
-            self.db_session.add(assistant_message)
-            self.db_session.commit()
+            self._queue_message('assistant', ai_response)
 
             # TODO: Plugin hook for conversation logging and analytics
 
             self.turn_count += 1
 
-            logger.info(f"Processed turn {self.turn_count} for call {self.call_sid}")
+            logger.info("Processed turn %s for call %s", self.turn_count, self.call_sid)
 
             return ai_response
 
         except Exception as e:
-            logger.error(f"Error processing conversation for {self.call_sid}: {e}")
+            logger.error("Error processing conversation for %s: %s", self.call_sid, e)
             return "I'm sorry, I had trouble processing that. Could you please repeat your question?"
 
+    def _queue_message(self, role: str, content: str):
+        """
+        Queue a conversation message for batched persistence
+        """
+        if not self.call_record:
+            return
+
+        self._pending_messages.append({
+            'call_id': self.call_record.id,
+            'role': role,
+            'content': content,
+            # Stamp now rather than at flush time; naive UTC like the column default
+            'timestamp': datetime.now(timezone.utc).replace(tzinfo=None)
+        })
+        self._maybe_flush_messages()
+
+    def _maybe_flush_messages(self):
+        """
+        Flush queued messages once a full batch has accumulated
+        """
+        if len(self._pending_messages) >= self.MESSAGE_FLUSH_EVERY:
+            self.flush_messages()
+
+    def flush_messages(self):
+        """
+        Persist queued conversation messages in a single commit
+        """
+        if not self._pending_messages:
+            return
+
+        messages = list(self._pending_messages)
+        self._pending_messages.clear()
+
+        if self.db_writer is not None and has_app_context() and not current_app.testing:
+            # Commit on the background writer; the caller returns immediately
+            app = current_app._get_current_object()
+            self.db_writer.submit(self.call_sid, lambda: self._save_messages(app, messages))
+            return
+
+        try:
+            self.db_session.execute(Message.__table__.insert(), messages)
+            self.db_session.commit()
+        except Exception as e:
+            logger.error("Error saving messages for call %s: %s", self.call_sid, e)
+            self.db_session.rollback()
+
+    def _save_messages(self, app, messages: List[Dict[str, Any]]):
+        """
+        Persist messages from a background writer thread in its own app context
+
+        Failed batches are retried within this job, with a growing pause, up to
+        MESSAGE_WRITE_ATTEMPTS times; a flush queued behind the job therefore
+        waits for the final attempt.
+        """
+        for attempt in range(1, self.MESSAGE_WRITE_ATTEMPTS + 1):
+            with app.app_context():
+                try:
+                    db.session.execute(Message.__table__.insert(), messages)
+                    db.session.commit()
+                    return
+                except Exception as e:
+                    db.session.rollback()
+                    error = e
+
+            if attempt < self.MESSAGE_WRITE_ATTEMPTS:
+                logger.warning("Retrying message write for call %s (attempt %s): %s", self.call_sid, attempt, error)
+                time.sleep(self.MESSAGE_RETRY_DELAY * attempt)
+
+        logger.error("Dropping %s messages for call %s after %s attempts: %s", len(messages), self.call_sid, attempt, error)
+
+    def _summarize(self, call_status: str) -> Dict[str, Any]:
+        """
+        Summarize the conversation, skipping the LLM for trivial or failed calls
+        """
+        if self.turn_count < self.MIN_TURNS_FOR_SUMMARY or call_status in self.NO_SUMMARY_STATUSES:
+            return {
+                'summary': f"Call {call_status} after {self.turn_count} turn(s)",
+                'key_topics': [],
+                'sentiment': 'neutral',
+                'resolution_status': 'incomplete'
+            }
+
+        return self.agent_brain.generate_summary(list(self.conversation_history))
+
     def end_call(self, call_status: str = 'completed') -> Dict[str, Any]:
         """
         End the call session and generate summary
@@ -183,20 +358,25 @@ class CallSession:
         try:
             self.is_active = False
 
+            # Persist any conversation turns still queued and wait for the writer
+            self.flush_messages()
+            if self.db_writer is not None and not self.db_writer.flush(self.call_sid):
+                logger.warning("Timed out waiting for queued writes of call %s", self.call_sid)
+
             # Generate conversation summary
-            summary = self.agent_brain.generate_summary(self.conversation_history)
+            summary = self._summarize(call_status)
 
             # Update call record
             if self.call_record:
                 self.call_record.status = call_status
-                self.call_record.duration = (datetime.utcnow() - self.created_at).total_seconds()
+                self.call_record.duration = time.monotonic() - self._created_monotonic
                 self.call_record.turn_count = self.turn_count
                 self.call_record.summary = summary.get('summary', 'Call completed')
                 self.db_session.commit()
 
             # TODO: Plugin hook for call summary storage and post-call processing
 
-            logger.info(f"Call session {self.call_sid} ended with status: {call_status}")
+            logger.info("Call session %s ended with status: %s", self.call_sid, call_status)
 
             return {
                 'call_sid': self.call_sid,
@@ -207,7 +387,7 @@ class CallSession:
             }
 
         except Exception as e:
-            logger.error(f"Error ending call {self.call_sid}: {e}")
+            logger.error("Error ending call %s: %s", self.call_sid, e)
             return {
                 'call_sid': self.call_sid,
                 'agent_type': self.agent_type,
@@ -233,22 +413,42 @@ class CallSession:
 class CallSessionManager:
     """
     Thread-safe manager for call sessions
+
+    Reads and removals rely on dict operations being atomic under the GIL;
+    check-then-insert paths are serialized per call_sid through a small set of
+    striped locks so that concurrent calls do not contend on a single
+    manager-wide lock.
     """
 
+    LOCK_STRIPES = 16  # Must be a power of two
+
+    # Sessions older than this are treated as dropped calls and ended by the reaper
+    MAX_CALL_SECONDS = 3600
+    REAPER_INTERVAL_SECONDS = 60
+
     def __init__(self, session_factory: Optional[Callable[..., CallSession]] = None):
         self.sessions: Dict[str, CallSession] = {}
-        self.lock = threading.RLock()
+        self._stripes = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
         self.session_factory = session_factory
+        self._reaper_thread: Optional[threading.Thread] = None
+        self._reaper_stop = threading.Event()
         logger.info("CallSessionManager initialized")
 
+    def _lock_for(self, call_sid: str) -> threading.Lock:
+        """
+        Get the stripe lock guarding a call_sid
+        """
+        return self._stripes[hash(call_sid) & (self.LOCK_STRIPES - 1)]
+
     def create_session(self, call_sid: str, phone_number: str) -> CallSession:
         """
         Create a new call session
         """
-        with self.lock:
-            if call_sid in self.sessions:
-                logger.warning(f"Session {call_sid} already exists, returning existing")
-                return self.sessions[call_sid]
+        with self._lock_for(call_sid):
+            existing = self.sessions.get(call_sid)
+            if existing is not None:
+                logger.warning("Session %s already exists, returning existing", call_sid)
+                return existing
 
             if self.session_factory is None:
                 raise ValueError("No CallSession factory provided to CallSessionManager")
@@ -256,62 +456,133 @@ class CallSessionManager:
             session = self.session_factory(call_sid, phone_number)
             self.sessions[call_sid] = session
 
-            logger.info(f"Created new session for call {call_sid}")
+            logger.info("Created new session for call %s", call_sid)
             return session
 
     def get_session(self, call_sid: str) -> Optional[CallSession]:
         """
         Get an existing call session
         """
-        with self.lock:
-            return self.sessions.get(call_sid)
+        return self.sessions.get(call_sid)
 
     def end_session(self, call_sid: str, call_status: str = 'completed') -> Optional[Dict[str, Any]]:
         """
         End and remove a call session
         """
-        with self.lock:
-            session = self.sessions.get(call_sid)
-            if session:
-                result = session.end_call(call_status)
-                del self.sessions[call_sid]
-                logger.info(f"Ended and removed session {call_sid}")
-                return result
-            else:
-                logger.warning(f"Attempted to end non-existent session {call_sid}")
-                return None
+        # Detach first so only one caller ends the session, then run end_call
+        # (summary generation, final writes) without holding any lock
+        session = self.sessions.pop(call_sid, None)
+        if session:
+            result = session.end_call(call_status)
+            logger.info("Ended and removed session %s", call_sid)
+            return result
+        else:
+            logger.warning("Attempted to end non-existent session %s", call_sid)
+            return None
 
     def get_active_sessions(self) -> List[Dict[str, Any]]:
         """
         Get information about all active sessions
         """
-        with self.lock:
-            return [session.get_session_info() for session in self.sessions.values() if session.is_active]
+        return [session.get_session_info() for session in list(self.sessions.values()) if session.is_active]
+
+    def active_session_count(self) -> int:
+        """
+        Count active sessions without building their info dicts (gauge for dashboards)
+        """
+        return sum(1 for session in list(self.sessions.values()) if session.is_active)
 
     def cleanup_inactive_sessions(self):
         """
         Remove inactive sessions (cleanup utility)
         """
-        with self.lock:
-            inactive_sids = [sid for sid, session in self.sessions.items() if not session.is_active]
-            for sid in inactive_sids:
-                del self.sessions[sid]
+        inactive_sids = [sid for sid, session in list(self.sessions.items()) if not session.is_active]
+        for sid in inactive_sids:
+            with self._lock_for(sid):
+                session = self.sessions.get(sid)
+                if session is not None and not session.is_active:
+                    self.sessions.pop(sid, None)
+
+        if inactive_sids:
+            logger.info("Cleaned up %s inactive sessions", len(inactive_sids))
+
+    def reap_stale_sessions(self, max_call_seconds: Optional[float] = None) -> int:
+        """
+        End sessions whose call never sent a final status webhook
+
+        Inactive sessions are dropped and sessions older than max_call_seconds
+        are ended as 'abandoned' so their call record and summary are written.
+        """
+        if max_call_seconds is None:
+            max_call_seconds = self.MAX_CALL_SECONDS
+
+        self.cleanup_inactive_sessions()
+
+        now = time.monotonic()
+        stale_sids = [
+            sid for sid, session in list(self.sessions.items())
+            if now - session._created_monotonic > max_call_seconds
+        ]
+        reaped = 0
+        for sid in stale_sids:
+            if self.end_session(sid, call_status='abandoned') is not None:
+                reaped += 1
+
+        if reaped:
+            logger.warning("Reaped %s stale call sessions", reaped)
+        return reaped
+
+    def start_reaper(self, app, interval: Optional[float] = None):
+        """
+        Start the daemon thread that periodically reaps stale sessions
+        """
+        if self._reaper_thread is not None and self._reaper_thread.is_alive():
+            return
 
-            if inactive_sids:
-                logger.info(f"Cleaned up {len(inactive_sids)} inactive sessions")
+        interval = interval if interval is not None else self.REAPER_INTERVAL_SECONDS
+        self._reaper_stop.clear()
+
+        def run():
+            while not self._reaper_stop.wait(interval):
+                try:
+                    with app.app_context():
+                        self.reap_stale_sessions()
+                    logger.debug("Active call sessions: %s", self.active_session_count())
+                except Exception as e:
+                    logger.error("Session reaper pass failed: %s", e)
+
+        self._reaper_thread = threading.Thread(target=run, name="call-session-reaper", daemon=True)
+        self._reaper_thread.start()
+
+    def stop_reaper(self):
+        """
+        Stop the reaper thread after its current pass
+        """
+        self._reaper_stop.set()
+
+# Background writer shared by all call sessions
+db_writer = BackgroundDBWriter()
 
 def create_call_session_factory():
     """
     Factory function that creates CallSession instances with unified dependencies
+
+    Sessions share the pooled db.session; every CallSession method that writes
+    must commit or roll back before returning so no pooled connection is held
+    between webhook requests.
     """
+    # Static for the process lifetime, so read it once rather than per call
+    twilio_phone_number = os.getenv('TWILIO_PHONE_NUMBER', '+19786432034')
+
     def session_factory(call_sid: str, phone_number: str):
         return CallSession(
             call_sid=call_sid,
             phone_number=phone_number,
             agent_brain=agent_brain,  # Use unified agent brain
             call_router=call_router,
-            twilio_phone_number=os.getenv('TWILIO_PHONE_NUMBER', '+19786432034'),
-            db_session=db.session
+            twilio_phone_number=twilio_phone_number,
+            db_session=db.session,
+            db_writer=db_writer
         )
     return session_factory
 
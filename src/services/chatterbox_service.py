@@ -4,24 +4,69 @@ Provides emotion-aware text-to-speech using Resemble AI's Chatterbox model
 """
 import os
 import logging
-import io
-import tempfile
-from typing import Optional, Dict, Any, Tuple
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Optional, Dict, Any, Tuple, Iterator
 import numpy as np
 import torch
 import torchaudio
+from src.services.tts_batcher import TTSBatcher
+from src.utils.audio_codec import float_to_pcm16, mulaw_encode, mulaw_wav, pcm16_wav, read_wav
 
 logger = logging.getLogger(__name__)
 
+# Emotion trigger phrases as one flat table in detection priority order;
+# the first phrase found in the text decides the emotion
+_EMOTION_PHRASES = tuple(
+    (phrase, emotion)
+    for emotion, phrases in (
+        ('apologetic', ('sorry', 'apologize', 'mistake', 'error', 'unfortunately')),
+        ('excited', ('great news', 'congratulations', 'approved', 'excellent', 'wonderful')),
+        ('empathetic', ('understand', 'help you', 'assist', 'concern', 'worry')),
+        ('calm', ('relax', 'take your time', 'no rush', 'whenever you\'re ready')),
+    )
+    for phrase in phrases
+)
+
+# Sentence boundaries used to cut long responses into separately generated clips
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+# Autocast dtypes for the reduced-precision CHATTERBOX_PRECISION settings
+_AUTOCAST_DTYPES = {
+    'bf16': torch.bfloat16,
+    'fp16': torch.float16,
+}
+
+# Shared by every ChatterboxService so all generation goes through one queue
+tts_batcher = TTSBatcher()
+
 class ChatterboxService:
     """
     Service for integrating Resemble AI's Chatterbox TTS
     """
     
+    SAMPLE_RATE = 24000  # Chatterbox output sample rate
+    TWILIO_SAMPLE_RATE = 8000
+    
+    # Repeated phrases (greetings, fallbacks) are served from an LRU of encoded audio;
+    # only short texts are cached to keep memory bounded
+    TTS_CACHE_SIZE = 256
+    TTS_CACHE_MAX_TEXT_LENGTH = 200
+    
     def __init__(self):
         self.model = None
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.model_loaded = False
+        self.precision = self._resolve_precision()
+        
+        # Resample modules keyed by source rate; building one computes its sinc kernel
+        self._resamplers: Dict[int, torchaudio.transforms.Resample] = {}
+        
+        self._tts_cache: "OrderedDict[tuple, Tuple[bytes, Dict[str, Any]]]" = OrderedDict()
+        self._tts_cache_lock = threading.Lock()
         
         # Voice sample paths for different agents
         self.voice_samples = {
@@ -32,6 +77,14 @@ class ChatterboxService:
             'scheduling': os.getenv('SCHEDULING_VOICE_SAMPLE', None)
         }
         
+        # Samples that exist, resolved once to absolute paths; new samples are
+        # picked up on restart
+        self._voice_sample_paths = {
+            agent: os.path.abspath(path)
+            for agent, path in self.voice_samples.items()
+            if path and os.path.exists(path)
+        }
+        
         # Emotion settings for different contexts
         self.emotion_presets = {
             'neutral': {'exaggeration': 0.0, 'cfg_weight': 5.0},
@@ -51,7 +104,7 @@ class ChatterboxService:
                 
             from chatterbox.tts import ChatterboxTTS
             
-            logger.info(f"Loading Chatterbox model on {self.device}")
+            logger.info(f"Loading Chatterbox model on {self.device} ({self.precision})")
             self.model = ChatterboxTTS.from_pretrained(device=self.device)
             self.model_loaded = True
             logger.info("Chatterbox model loaded successfully")
@@ -64,6 +117,47 @@ class ChatterboxService:
             logger.error(f"Failed to load Chatterbox model: {e}")
             return False
     
+    def _resolve_precision(self) -> str:
+        """
+        Pick the inference precision from CHATTERBOX_PRECISION
+        
+        Reduced precision only applies on CUDA; the default is bf16 where the
+        GPU supports it (Ampere and newer) and fp16 otherwise.
+        """
+        if self.device != "cuda":
+            return 'fp32'
+        
+        precision = os.getenv('CHATTERBOX_PRECISION', '').lower()
+        if precision in _AUTOCAST_DTYPES or precision == 'fp32':
+            return precision
+        if precision:
+            logger.warning(f"Unknown CHATTERBOX_PRECISION '{precision}', using default")
+        
+        return 'bf16' if torch.cuda.is_bf16_supported() else 'fp16'
+    
+    def warmup(self) -> bool:
+        """
+        Load the model and run one short generation before serving traffic
+        
+        The first generate call initializes CUDA kernels and allocator pools;
+        doing that at startup keeps the cost off the first caller.
+        
+        Returns:
+            Success boolean
+        """
+        if not self.load_model():
+            return False
+        
+        try:
+            start = time.monotonic()
+            emotion_settings = self.emotion_presets['neutral']
+            tts_batcher.submit(self._generate, "ok", None, emotion_settings).result()
+            logger.info(f"Chatterbox warmup completed in {time.monotonic() - start:.2f}s")
+            return True
+        except Exception as e:
+            logger.error(f"Chatterbox warmup failed: {e}")
+            return False
+    
     def detect_emotion_context(self, text: str, conversation_context: Optional[Dict] = None) -> str:
         """
         Detect appropriate emotion based on text and context
@@ -77,21 +171,10 @@ class ChatterboxService:
         """
         text_lower = text.lower()
         
-        # Apologetic contexts
-        if any(phrase in text_lower for phrase in ['sorry', 'apologize', 'mistake', 'error', 'unfortunately']):
-            return 'apologetic'
-        
-        # Excited contexts
-        if any(phrase in text_lower for phrase in ['great news', 'congratulations', 'approved', 'excellent', 'wonderful']):
-            return 'excited'
-        
-        # Empathetic contexts
-        if any(phrase in text_lower for phrase in ['understand', 'help you', 'assist', 'concern', 'worry']):
-            return 'empathetic'
-        
-        # Calm contexts
-        if any(phrase in text_lower for phrase in ['relax', 'take your time', 'no rush', 'whenever you\'re ready']):
-            return 'calm'
+        # Apologetic, excited, empathetic, then calm phrases (single priority-ordered scan)
+        for phrase, emotion in _EMOTION_PHRASES:
+            if phrase in text_lower:
+                return emotion
         
         # Check conversation context if provided
         if conversation_context:
@@ -108,7 +191,8 @@ class ChatterboxService:
         text: str, 
         agent_type: Optional[str] = 'general',
         emotion: Optional[str] = None,
-        conversation_context: Optional[Dict] = None
+        conversation_context: Optional[Dict] = None,
+        twilio_optimized: bool = False
     ) -> Tuple[bytes, Dict[str, Any]]:
         """
         Convert text to speech using Chatterbox with emotion control
@@ -118,6 +202,7 @@ class ChatterboxService:
             agent_type: Type of agent (for voice selection)
             emotion: Explicit emotion override
             conversation_context: Conversation history for emotion detection
+            twilio_optimized: Encode straight to 8kHz μ-law WAV from the generated tensor
             
         Returns:
             Tuple of (audio_bytes, metadata)
@@ -135,27 +220,28 @@ class ChatterboxService:
             emotion_settings = self.emotion_presets.get(emotion, self.emotion_presets['neutral'])
             
             # Get voice sample for agent type
-            voice_sample_path = self.voice_samples.get(agent_type)
+            voice_sample_path = self._voice_sample_paths.get(agent_type)
+            
+            cache_key = (text, agent_type, emotion, voice_sample_path, twilio_optimized)
+            cached = self._get_cached_speech(cache_key)
+            if cached is not None:
+                return cached
             
             # Generate speech
             logger.info(f"Generating speech for agent '{agent_type}' with emotion '{emotion}'")
             
-            if voice_sample_path and os.path.exists(voice_sample_path):
-                # Generate with voice cloning
-                wav = self.model.generate(
-                    text=text,
-                    audio_prompt_path=voice_sample_path,
-                    **emotion_settings
-                )
-            else:
-                # Generate without voice cloning
-                wav = self.model.generate(
-                    text=text,
-                    **emotion_settings
-                )
+            wav = tts_batcher.submit(self._generate, text, voice_sample_path, emotion_settings).result()
             
             # Convert to audio bytes
-            audio_bytes = self._wav_to_bytes(wav)
+            audio_bytes = b""
+            if twilio_optimized:
+                try:
+                    audio_bytes = self._tensor_to_twilio_bytes(wav, self.SAMPLE_RATE)
+                except Exception as e:
+                    logger.error(f"Error optimizing audio for Twilio: {e}")
+                    twilio_optimized = False
+            if not audio_bytes:
+                audio_bytes = self._wav_to_bytes(wav)
             
             metadata = {
                 'agent_type': agent_type,
@@ -163,16 +249,121 @@ class ChatterboxService:
                 'emotion_settings': emotion_settings,
                 'voice_cloned': bool(voice_sample_path),
                 'text_length': len(text),
-                'device': self.device
+                'device': self.device,
+                'optimized_for_twilio': twilio_optimized
             }
             
             logger.info(f"Generated {len(audio_bytes)} bytes of audio")
+            if audio_bytes:
+                # Key by the format actually produced, so a failed μ-law conversion is
+                # retried (and logged) on the next request instead of served from cache
+                cache_key = (text, agent_type, emotion, voice_sample_path, twilio_optimized)
+                self._cache_speech(cache_key, audio_bytes, metadata)
             return audio_bytes, metadata
             
         except Exception as e:
             logger.error(f"Chatterbox TTS error: {e}")
             return b"", {"error": str(e)}
     
+    def _get_cached_speech(self, cache_key: tuple) -> Optional[Tuple[bytes, Dict[str, Any]]]:
+        """
+        Look up previously generated audio, marking the entry most recently used
+        """
+        with self._tts_cache_lock:
+            entry = self._tts_cache.get(cache_key)
+            if entry is None:
+                return None
+            self._tts_cache.move_to_end(cache_key)
+        
+        audio_bytes, metadata = entry
+        return audio_bytes, {**metadata, 'cached': True}
+    
+    def _cache_speech(self, cache_key: tuple, audio_bytes: bytes, metadata: Dict[str, Any]):
+        """
+        Store generated audio for short texts, evicting the least recently used entry
+        """
+        if len(cache_key[0]) > self.TTS_CACHE_MAX_TEXT_LENGTH:
+            return
+        
+        with self._tts_cache_lock:
+            self._tts_cache[cache_key] = (audio_bytes, dict(metadata))
+            self._tts_cache.move_to_end(cache_key)
+            while len(self._tts_cache) > self.TTS_CACHE_SIZE:
+                self._tts_cache.popitem(last=False)
+    
+    def text_to_speech_stream(
+        self,
+        text: str,
+        agent_type: Optional[str] = 'general',
+        emotion: Optional[str] = None,
+        conversation_context: Optional[Dict] = None,
+        twilio_optimized: bool = False
+    ) -> Iterator[Tuple[bytes, Dict[str, Any]]]:
+        """
+        Convert text to speech one sentence at a time
+        
+        Each yielded clip is a complete WAV that can be played as soon as it is
+        ready, so playback of a long response starts after its first sentence
+        rather than after the whole utterance. Emotion is decided once for the
+        full text so every clip uses the same settings.
+        
+        Args:
+            text: Text to convert
+            agent_type: Type of agent (for voice selection)
+            emotion: Explicit emotion override
+            conversation_context: Conversation history for emotion detection
+            twilio_optimized: Encode each clip as 8kHz μ-law WAV
+            
+        Yields:
+            Tuples of (audio_bytes, metadata) with chunk_index and chunk_count
+        """
+        if emotion is None:
+            emotion = self.detect_emotion_context(text, conversation_context)
+        
+        sentences = [sentence for sentence in _SENTENCE_BOUNDARY.split(text.strip()) if sentence]
+        for index, sentence in enumerate(sentences):
+            audio_bytes, metadata = self.text_to_speech(
+                sentence,
+                agent_type=agent_type,
+                emotion=emotion,
+                twilio_optimized=twilio_optimized
+            )
+            metadata['chunk_index'] = index
+            metadata['chunk_count'] = len(sentences)
+            yield audio_bytes, metadata
+            
+            if not audio_bytes:
+                # Generation failed; the error is in the metadata just yielded
+                return
+    
+    def _generate(self, text: str, voice_sample_path: Optional[str], emotion_settings: Dict[str, float]) -> torch.Tensor:
+        """
+        Run the model for one utterance (called on the batcher thread)
+        """
+        autocast_dtype = _AUTOCAST_DTYPES.get(self.precision)
+        autocast = (
+            torch.autocast(device_type='cuda', dtype=autocast_dtype)
+            if autocast_dtype is not None else nullcontext()
+        )
+        
+        with torch.inference_mode(), autocast:
+            if voice_sample_path:
+                # Generate with voice cloning
+                wav = self.model.generate(
+                    text=text,
+                    audio_prompt_path=voice_sample_path,
+                    **emotion_settings
+                )
+            else:
+                # Generate without voice cloning
+                wav = self.model.generate(
+                    text=text,
+                    **emotion_settings
+                )
+        
+        # Audio encoding expects float32 samples
+        return wav.float()
+    
     def _wav_to_bytes(self, wav_tensor: torch.Tensor, sample_rate: int = 24000) -> bytes:
         """
         Convert PyTorch audio tensor to bytes
@@ -185,19 +376,8 @@ class ChatterboxService:
             Audio bytes in WAV format
         """
         try:
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_file:
-                # Save tensor as WAV
-                torchaudio.save(tmp_file.name, wav_tensor.unsqueeze(0), sample_rate)
-                
-                # Read bytes
-                with open(tmp_file.name, 'rb') as f:
-                    audio_bytes = f.read()
-                
-                # Clean up
-                os.unlink(tmp_file.name)
-                
-            return audio_bytes
+            # Encode in memory with the same PCM path as the Twilio output
+            return pcm16_wav(float_to_pcm16(wav_tensor.detach().cpu().numpy()), sample_rate)
             
         except Exception as e:
             logger.error(f"Error converting audio to bytes: {e}")
@@ -215,45 +395,52 @@ class ChatterboxService:
             Optimized audio bytes
         """
         try:
-            # Load audio
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_in:
-                tmp_in.write(audio_bytes)
-                tmp_in.flush()
-                
-                # Load with torchaudio
-                waveform, sample_rate = torchaudio.load(tmp_in.name)
-                os.unlink(tmp_in.name)
-            
-            # Convert to mono if stereo
-            if waveform.shape[0] > 1:
-                waveform = torch.mean(waveform, dim=0, keepdim=True)
-            
-            # Resample to 8kHz
-            if sample_rate != 8000:
-                resampler = torchaudio.transforms.Resample(sample_rate, 8000)
-                waveform = resampler(waveform)
-            
-            # Save as μ-law encoded
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_out:
-                torchaudio.save(
-                    tmp_out.name, 
-                    waveform, 
-                    8000,
-                    encoding='ULAW',
-                    bits_per_sample=8
-                )
-                
-                with open(tmp_out.name, 'rb') as f:
-                    optimized_bytes = f.read()
-                
-                os.unlink(tmp_out.name)
-            
-            return optimized_bytes
+            samples, sample_rate = read_wav(audio_bytes)
+            return self._tensor_to_twilio_bytes(torch.from_numpy(samples), sample_rate)
             
         except Exception as e:
             logger.error(f"Error optimizing audio for Twilio: {e}")
             return audio_bytes  # Return original if optimization fails
     
+    def _tensor_to_twilio_bytes(self, waveform: torch.Tensor, sample_rate: int) -> bytes:
+        """
+        Encode an audio tensor as 8kHz mono μ-law WAV entirely in memory
+        
+        Args:
+            waveform: Audio tensor, either (samples,) or (channels, samples)
+            sample_rate: Sample rate of the tensor
+            
+        Returns:
+            μ-law encoded WAV bytes
+        """
+        if waveform.dim() == 1:
+            waveform = waveform.unsqueeze(0)
+        
+        # Convert to mono if stereo
+        if waveform.shape[0] > 1:
+            waveform = torch.mean(waveform, dim=0, keepdim=True)
+        
+        # Resample to 8kHz
+        if sample_rate != self.TWILIO_SAMPLE_RATE:
+            resampler = self._get_resampler(sample_rate)
+            waveform = resampler(waveform.to(self.device, dtype=torch.float32))
+        
+        # μ-law encode directly instead of going through torchaudio's WAV writer
+        samples = waveform.detach().reshape(-1).cpu().numpy()
+        return mulaw_wav(mulaw_encode(float_to_pcm16(samples)))
+    
+    def _get_resampler(self, sample_rate: int) -> torchaudio.transforms.Resample:
+        """
+        Get the cached resampler from sample_rate to 8kHz, building it on first use
+        """
+        resampler = self._resamplers.get(sample_rate)
+        if resampler is None:
+            resampler = torchaudio.transforms.Resample(
+                sample_rate, self.TWILIO_SAMPLE_RATE, dtype=torch.float32
+            ).to(self.device)
+            self._resamplers[sample_rate] = resampler
+        return resampler
+    
     def get_emotion_from_agent_state(self, agent_type: str, call_state: Dict) -> str:
         """
         Determine emotion based on agent type and call state
@@ -3,25 +3,29 @@ Coqui TTS Integration Service
 High-quality, low-latency text-to-speech with voice cloning capabilities
 """
 import os
+import functools
 import logging
 import io
+import re
 import time
 import tempfile
 import threading
-from typing import Optional, Dict, Any, Tuple
+from contextlib import nullcontext
+from typing import Optional, Dict, Any, Tuple, List, Iterator
 import numpy as np
 from pathlib import Path
 import wave
 import json
 import hashlib
 from collections import OrderedDict
+from src.utils.audio_codec import float_to_pcm16, mulaw_encode, mulaw_wav, resample_to_twilio
 
 # TTS imports
 try:
     from TTS.api import TTS
     import torch
-    import torchaudio
     import librosa
+    from src.services.tts_batcher import TTSBatcher
     COQUI_AVAILABLE = True
 except ImportError:
     COQUI_AVAILABLE = False
@@ -29,16 +33,86 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# XTTS activations change size with every utterance; expandable segments let the CUDA
+# caching allocator grow in place instead of fragmenting. The allocator reads this on
+# its first CUDA allocation, and the option only exists from torch 2.1.
+if COQUI_AVAILABLE and tuple(int(part) for part in torch.__version__.split('.')[:2]) >= (2, 1):
+    os.environ.setdefault(
+        'PYTORCH_CUDA_ALLOC_CONF',
+        'expandable_segments:True,max_split_size_mb:128,garbage_collection_threshold:0.8'
+    )
+
+# Emotion trigger phrases compiled into one alternation per emotion, in detection priority order
+_EMOTION_PATTERNS = tuple(
+    (emotion, re.compile('|'.join(re.escape(phrase) for phrase in phrases)))
+    for emotion, phrases in (
+        ('apologetic', ('sorry', 'apologize', 'mistake', 'error', 'unfortunately')),
+        ('excited', ('great news', 'congratulations', 'approved', 'excellent', 'wonderful')),
+        ('empathetic', ('understand', 'help you', 'assist', 'concern', 'worry')),
+        ('calm', ('relax', 'take your time', 'no rush', 'whenever you\'re ready')),
+    )
+)
+
+# Other workers share the disk tier, so its byte count is re-measured at least this often
+DISK_CACHE_RESCAN_SECONDS = 60
+
+# Sentence boundaries used to cut long text into separately generated chunks
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+@functools.lru_cache(maxsize=1024)
+def _phrase_emotion(text: str) -> Optional[str]:
+    """Emotion triggered by a phrase in the text, if any; each regex scans the text once"""
+    text_lower = text.lower()
+    for emotion, pattern in _EMOTION_PATTERNS:
+        if pattern.search(text_lower):
+            return emotion
+    return None
+
+@functools.lru_cache(maxsize=64)
+def _decide_emotion(agent_type: str, frustrated: bool, high_interest: bool) -> str:
+    """Emotion for an agent given the call-state features that affect it"""
+    # Billing agents should be more empathetic
+    if agent_type == 'billing' and frustrated:
+        return 'empathetic'
+    
+    # Sales agents should be more excited
+    if agent_type == 'sales' and high_interest:
+        return 'excited'
+    
+    # Support agents should be calm and reassuring
+    if agent_type == 'support':
+        return 'calm'
+    
+    # Scheduling agents (and everyone else) stay neutral and professional
+    return 'neutral'
+
 class CoquiTTSService:
     """
     Service for integrating Coqui TTS with voice cloning and emotion support
     """
     
+    # Utterances longer than this release cached CUDA memory after generation
+    LONG_UTTERANCE_CHARS = 400
+    
+    # Distinct sentences whose XTTS token IDs are kept across voices and emotions
+    TOKEN_CACHE_SIZE = 512
+    
+    # Voice profiles whose conditioning latents stay resident on the device
+    VOICE_EMBEDDING_CACHE_SIZE = 32
+    
+    # Longer text is generated in sentence-packed chunks joined with a short crossfade
+    CHUNK_MAX_CHARS = 180
+    CROSSFADE_SECONDS = 0.03
+    
     def __init__(self):
         self.model = None
         self.model_name = "tts_models/multilingual/multi-dataset/xtts_v2"
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.model_loaded = False
+        self._load_lock = threading.Lock()
+        self._load_event = threading.Event()
+        self._init_done = threading.Event()  # Background load finished, loaded or not
+        self._decoder_compiled = False
         
         # Voice sample paths for different agents
         self.voice_samples = {
@@ -49,13 +123,25 @@ class CoquiTTSService:
             'scheduling': 'voice_samples/scheduling_voice_sample.wav'
         }
         
-        # Voice embeddings cache
-        self.voice_embeddings = {}
+        # Voice embeddings cache (LRU, resident on the synthesis device), persisted
+        # to disk so restarts skip recomputing them
+        self.voice_embeddings = OrderedDict()
         self.embeddings_lock = threading.Lock()
+        self.latent_cache_dir = Path(os.getenv('COQUI_LATENT_CACHE_DIR', 'cache/voice_latents'))
         
-        # Audio cache for frequently used phrases
+        # Concurrent requests are coalesced onto one generation thread
+        self._batcher = TTSBatcher() if COQUI_AVAILABLE else None
+        
+        # Audio cache for frequently used phrases: a small in-memory tier bounded
+        # by bytes, backed by a content-addressed directory that survives restarts
         self.audio_cache = OrderedDict()
-        self.cache_size = 100
+        self.cache_max_bytes = int(os.getenv('COQUI_MEMORY_CACHE_MB', '64')) * 1024 * 1024
+        self._cache_bytes = 0
+        self.disk_cache_dir = Path(os.getenv('COQUI_AUDIO_CACHE_DIR', 'cache/tts_audio'))
+        self.disk_cache_max_bytes = int(os.getenv('COQUI_AUDIO_CACHE_MB', '2048')) * 1024 * 1024
+        self._disk_cache_bytes = None  # Measured on first write
+        self._disk_cache_scanned_at = 0.0  # time.monotonic() of the last measurement
+        self._cache_lock = threading.Lock()
         self.cache_hits = 0
         self.cache_misses = 0
         
@@ -103,22 +189,59 @@ class CoquiTTSService:
             if COQUI_AVAILABLE:
                 logger.info("Starting background initialization of Coqui TTS model...")
                 self.load_model()
+                self._init_done.set()
                 self._preload_voice_embeddings()
+                self._warmup()
         except Exception as e:
             logger.error(f"Background initialization failed: {e}")
+        finally:
+            self._init_done.set()
+    
+    def wait_ready(self, timeout: Optional[float] = None) -> Optional[bool]:
+        """
+        Wait for the background model load to finish
+        
+        Returns:
+            Whether the model loaded, or None if still loading after timeout
+        """
+        if not self._init_done.wait(timeout):
+            return None
+        return self.model_loaded
     
     def load_model(self):
-        """Load the Coqui TTS model"""
-        try:
-            if self.model_loaded or not COQUI_AVAILABLE:
+        """Load the Coqui TTS model (once; concurrent callers wait for a load in progress)"""
+        if self._load_event.is_set() or not COQUI_AVAILABLE:
+            return self.model_loaded
+        
+        with self._load_lock:
+            if self._load_event.is_set():
                 return self.model_loaded
-                
+            return self._load_model_locked()
+    
+    def _load_model_locked(self):
+        """Load the model; the caller holds _load_lock"""
+        try:
             logger.info(f"Loading Coqui TTS model: {self.model_name} on {self.device}")
             
             # Initialize TTS with XTTS v2 for voice cloning
             self.model = TTS(self.model_name, progress_bar=False).to(self.device)
             
+            if self.device == "cuda":
+                # TF32 matmuls and cuDNN autotuning for inference
+                torch.backends.cuda.matmul.allow_tf32 = True
+                torch.backends.cudnn.allow_tf32 = True
+                torch.backends.cudnn.benchmark = True
+            elif os.getenv('COQUI_CPU_THREADS'):
+                # Cap intra-op threads when several workers share the CPU
+                torch.set_num_threads(int(os.getenv('COQUI_CPU_THREADS')))
+            
+            self._cache_tokenizer()
+            
+            if self.device == "cuda" and os.getenv('COQUI_COMPILE', 'false').lower() == 'true':
+                self._compile_decoder()
+            
             self.model_loaded = True
+            self._load_event.set()
             logger.info("Coqui TTS model loaded successfully")
             return True
             
@@ -126,6 +249,60 @@ class CoquiTTSService:
             logger.error(f"Failed to load Coqui TTS model: {e}")
             return False
     
+    def _cache_tokenizer(self):
+        """
+        Memoize the XTTS tokenizer so repeated sentences skip text cleanup and BPE
+        
+        XTTS inference takes raw text and encodes each sentence itself, so the
+        cache wraps tokenizer.encode in place; the same line spoken with another
+        voice or emotion reuses its token IDs.
+        """
+        tokenizer = getattr(self.model.synthesizer.tts_model, 'tokenizer', None)
+        if tokenizer is None or not hasattr(tokenizer, 'encode'):
+            return
+        tokenizer.encode = functools.lru_cache(maxsize=self.TOKEN_CACHE_SIZE)(tokenizer.encode)
+    
+    def _compile_decoder(self):
+        """
+        Compile the XTTS autoregressive decoder with torch.compile
+        
+        The GPT decoder runs once per generated token; compiling it fuses its
+        attention/MLP kernels and, in reduce-overhead mode, replays them as CUDA
+        graphs. Falls back to eager execution if compilation is not possible.
+        """
+        try:
+            gpt = self.model.synthesizer.tts_model.gpt
+            if not hasattr(gpt, 'gpt_inference'):
+                logger.info("XTTS decoder not found; skipping torch.compile")
+                return
+            
+            # Decoding grows the KV length every step and each emotion preset's sampling
+            # constants specialize separately; bound the recompiles that triggers
+            torch._dynamo.config.cache_size_limit = 16
+            gpt.gpt_inference = torch.compile(gpt.gpt_inference, mode='reduce-overhead')
+            self._decoder_compiled = True
+            logger.info("Compiled XTTS decoder with torch.compile (reduce-overhead)")
+        except Exception as e:
+            logger.warning(f"torch.compile of XTTS decoder failed, using eager mode: {e}")
+    
+    def _warmup(self):
+        """
+        Run short syntheses so kernels (and compiled graphs) are ready before traffic
+        
+        With a compiled decoder, each emotion preset's fixed sampling settings are
+        specialized into their own graphs, so every preset is warmed, not just neutral.
+        """
+        if not self.model_loaded:
+            return
+        try:
+            start = time.time()
+            presets = self.emotion_presets.values() if self._decoder_compiled else [self.emotion_presets['neutral']]
+            for emotion_settings in presets:
+                self._batcher.submit(self._generate, "ok", 'general', emotion_settings).result()
+            logger.info(f"Coqui TTS warmup completed in {time.time() - start:.2f}s")
+        except Exception as e:
+            logger.warning(f"Coqui TTS warmup failed: {e}")
+    
     def _preload_voice_embeddings(self):
         """Preload voice embeddings for all agent types"""
         for agent_type, sample_path in self.voice_samples.items():
@@ -136,24 +313,73 @@ class CoquiTTSService:
                 except Exception as e:
                     logger.error(f"Failed to preload embedding for {agent_type}: {e}")
     
+    def _latent_cache_path(self, voice_sample_path: str) -> Path:
+        """Disk cache location for a voice sample's conditioning latents, keyed by content"""
+        with open(voice_sample_path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:16]
+        return self.latent_cache_dir / f"latents_{digest}.pt"
+    
+    def _load_cached_latents(self, cache_path: Path) -> Any:
+        """Load conditioning latents from the disk cache, if present"""
+        if not cache_path.exists():
+            return None
+        try:
+            return tuple(torch.load(cache_path, map_location=self.device))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable latent cache {cache_path}: {e}")
+            return None
+    
+    def _save_cached_latents(self, cache_path: Path, embedding: Any):
+        """Write conditioning latents to the disk cache atomically"""
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as tmp_file:
+                    torch.save(tuple(tensor.cpu() for tensor in embedding), tmp_file)
+                os.replace(tmp_path, cache_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except Exception as e:
+            logger.warning(f"Could not persist voice latents to {cache_path}: {e}")
+    
+    def _prepare_latents(self, embedding: Any) -> Any:
+        """
+        Move conditioning latents to the synthesis device as contiguous tensors
+        
+        On CUDA they are stored in FP16 to match the autocast synthesis path and
+        halve their footprint; on CPU they keep the model's dtype.
+        """
+        dtype = torch.float16 if self.device == "cuda" else None
+        return tuple(tensor.to(self.device, dtype).contiguous() for tensor in embedding)
+    
     def _get_voice_embedding(self, agent_type: str, voice_sample_path: str) -> Any:
         """Get or compute voice embedding for an agent type"""
         with self.embeddings_lock:
             if agent_type in self.voice_embeddings:
+                self.voice_embeddings.move_to_end(agent_type)
                 return self.voice_embeddings[agent_type]
             
             try:
                 # Compute speaker embedding using the model
                 if hasattr(self.model, 'synthesizer') and hasattr(self.model.synthesizer, 'tts_model'):
-                    # For XTTS models
-                    embedding = self.model.synthesizer.tts_model.get_conditioning_latents(
-                        audio_path=voice_sample_path
-                    )
+                    # For XTTS models: (gpt_cond_latent, speaker_embedding), reused across restarts
+                    cache_path = self._latent_cache_path(voice_sample_path)
+                    embedding = self._load_cached_latents(cache_path)
+                    if embedding is None:
+                        embedding = self.model.synthesizer.tts_model.get_conditioning_latents(
+                            audio_path=voice_sample_path
+                        )
+                        self._save_cached_latents(cache_path, embedding)
+                    embedding = self._prepare_latents(embedding)
                 else:
                     # Fallback for other models
                     embedding = None
                 
                 self.voice_embeddings[agent_type] = embedding
+                if len(self.voice_embeddings) > self.VOICE_EMBEDDING_CACHE_SIZE:
+                    self.voice_embeddings.popitem(last=False)
                 return embedding
                 
             except Exception as e:
@@ -171,23 +397,10 @@ class CoquiTTSService:
         Returns:
             Emotion key
         """
-        text_lower = text.lower()
-        
-        # Apologetic contexts
-        if any(phrase in text_lower for phrase in ['sorry', 'apologize', 'mistake', 'error', 'unfortunately']):
-            return 'apologetic'
-        
-        # Excited contexts
-        if any(phrase in text_lower for phrase in ['great news', 'congratulations', 'approved', 'excellent', 'wonderful']):
-            return 'excited'
-        
-        # Empathetic contexts
-        if any(phrase in text_lower for phrase in ['understand', 'help you', 'assist', 'concern', 'worry']):
-            return 'empathetic'
-        
-        # Calm contexts
-        if any(phrase in text_lower for phrase in ['relax', 'take your time', 'no rush', 'whenever you\'re ready']):
-            return 'calm'
+        # Apologetic, excited, empathetic, then calm phrases (memoized per text)
+        emotion = _phrase_emotion(text)
+        if emotion is not None:
+            return emotion
         
         # Check conversation context if provided
         if conversation_context:
@@ -222,7 +435,7 @@ class CoquiTTSService:
         """
         try:
             # Ensure model is loaded
-            if not self.model_loaded and not self.load_model():
+            if not self._load_event.is_set() and not self.load_model():
                 logger.error("Failed to load Coqui TTS model")
                 return self._fallback_tts(text)
             
@@ -232,10 +445,12 @@ class CoquiTTSService:
             
             # Check cache
             cache_key = self._get_cache_key(text, agent_type, emotion)
-            if use_cache and cache_key in self.audio_cache:
+            cached = self._get_from_cache(cache_key, agent_type, emotion) if use_cache else None
+            if cached is not None:
                 self.cache_hits += 1
-                logger.info(f"Cache hit for: {text[:30]}... (hits: {self.cache_hits})")
-                return self.audio_cache[cache_key]
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info(f"Cache hit for: {text[:30]}... (hits: {self.cache_hits})")
+                return cached
             
             self.cache_misses += 1
             
@@ -249,39 +464,15 @@ class CoquiTTSService:
             start_time = time.time()
             logger.info(f"Generating speech for agent '{agent_type}' with emotion '{emotion}'")
             
-            if voice_sample_path and os.path.exists(voice_sample_path):
-                # Generate with voice cloning
-                with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_file:
-                    self.model.tts_to_file(
-                        text=text,
-                        speaker_wav=voice_sample_path,
-                        language="en",
-                        file_path=tmp_file.name,
-                        speed=emotion_settings['speed']
-                    )
-                    
-                    # Read the generated audio
-                    with open(tmp_file.name, 'rb') as f:
-                        audio_bytes = f.read()
-                    
-                    # Clean up
-                    os.unlink(tmp_file.name)
-            else:
-                # Generate without voice cloning
-                with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_file:
-                    self.model.tts_to_file(
-                        text=text,
-                        language="en",
-                        file_path=tmp_file.name,
-                        speed=emotion_settings['speed']
-                    )
-                    
-                    # Read the generated audio
-                    with open(tmp_file.name, 'rb') as f:
-                        audio_bytes = f.read()
-                    
-                    # Clean up
-                    os.unlink(tmp_file.name)
+            # Chunks are queued together so the batcher generates them back to back
+            sample_rate = self.model.synthesizer.output_sample_rate
+            futures = [
+                self._batcher.submit(self._generate, chunk, agent_type, emotion_settings)
+                for chunk in self._split_text(text)
+            ]
+            wav = self._join_chunks([future.result() for future in futures], sample_rate)
+            
+            audio_bytes = self._waveform_to_wav_bytes(wav, sample_rate)
             
             generation_time = time.time() - start_time
             
@@ -311,18 +502,280 @@ class CoquiTTSService:
             logger.error(f"Coqui TTS error: {e}")
             return self._fallback_tts(text)
     
+    def text_to_speech_stream(
+        self,
+        text: str,
+        agent_type: Optional[str] = 'general',
+        emotion: Optional[str] = None,
+        conversation_context: Optional[Dict] = None,
+        use_cache: bool = True
+    ) -> Iterator[Tuple[bytes, Dict[str, Any]]]:
+        """
+        Convert text to speech one chunk at a time
+        
+        Each yielded clip is a complete WAV that can be played as soon as it is
+        ready. Emotion is decided once for the full text so every clip uses the
+        same settings.
+        
+        Args:
+            text: Text to convert
+            agent_type: Type of agent (for voice selection)
+            emotion: Explicit emotion override
+            conversation_context: Conversation history for emotion detection
+            use_cache: Whether to use audio cache
+            
+        Yields:
+            Tuples of (audio_bytes, metadata) with chunk_index and chunk_count
+        """
+        if emotion is None:
+            emotion = self.detect_emotion_context(text, conversation_context)
+        
+        chunks = self._split_text(text)
+        for index, chunk in enumerate(chunks):
+            audio_bytes, metadata = self.text_to_speech(
+                chunk,
+                agent_type=agent_type,
+                emotion=emotion,
+                use_cache=use_cache
+            )
+            metadata = dict(metadata, chunk_index=index, chunk_count=len(chunks))
+            yield audio_bytes, metadata
+            
+            if metadata.get('fallback'):
+                # Generation failed; the fallback metadata was just yielded
+                return
+    
+    def _split_text(self, text: str) -> List[str]:
+        """
+        Split text at sentence boundaries, packing sentences greedily into chunks
+        of at most CHUNK_MAX_CHARS (a single longer sentence becomes its own chunk)
+        """
+        chunks = []
+        current = ''
+        for sentence in _SENTENCE_BOUNDARY.split(text.strip()):
+            if not sentence:
+                continue
+            if current and len(current) + 1 + len(sentence) > self.CHUNK_MAX_CHARS:
+                chunks.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        if current:
+            chunks.append(current)
+        return chunks or [text]
+    
+    def _join_chunks(self, wavs: List[Any], sample_rate: int) -> np.ndarray:
+        """Concatenate chunk waveforms with a linear crossfade at each seam"""
+        joined = np.asarray(wavs[0], dtype=np.float32).reshape(-1)
+        fade_length = int(sample_rate * self.CROSSFADE_SECONDS)
+        for wav in wavs[1:]:
+            wav = np.asarray(wav, dtype=np.float32).reshape(-1)
+            overlap = min(fade_length, len(joined), len(wav))
+            if overlap == 0:
+                joined = np.concatenate((joined, wav))
+                continue
+            fade_in = np.linspace(0.0, 1.0, overlap, dtype=np.float32)
+            seam = joined[-overlap:] * (1.0 - fade_in) + wav[:overlap] * fade_in
+            joined = np.concatenate((joined[:-overlap], seam, wav[overlap:]))
+        return joined
+    
+    def _generate(self, text: str, agent_type: str, emotion_settings: Dict[str, Any]):
+        """
+        Run the model for one utterance (called on the batcher thread)
+        """
+        # Pure inference: no autograd bookkeeping, FP16 tensor-core math on GPU
+        autocast = (
+            torch.autocast(device_type='cuda', dtype=torch.float16)
+            if self.device == "cuda" else nullcontext()
+        )
+        with torch.inference_mode(), autocast:
+            wav = self._synthesize(text, agent_type, emotion_settings)
+        
+        # Hand cached blocks from long utterances back so they don't pin peak memory
+        if self.device == "cuda" and len(text) > self.LONG_UTTERANCE_CHARS:
+            torch.cuda.empty_cache()
+        return wav
+    
+    def _synthesize(self, text: str, agent_type: str, emotion_settings: Dict[str, Any]):
+        """
+        Synthesize one utterance with or without voice cloning
+        """
+        voice_sample_path = self.voice_samples.get(agent_type)
+        has_voice_sample = bool(voice_sample_path) and os.path.exists(voice_sample_path)
+        voice_embedding = self._get_voice_embedding(agent_type, voice_sample_path) if has_voice_sample else None
+        
+        if voice_embedding is not None:
+            # Generate with voice cloning from the cached conditioning latents
+            gpt_cond_latent, speaker_embedding = voice_embedding
+            wav = self.model.synthesizer.tts_model.inference(
+                text,
+                "en",
+                gpt_cond_latent,
+                speaker_embedding,
+                temperature=emotion_settings['temperature'],
+                top_p=emotion_settings['top_p'],
+                top_k=emotion_settings['top_k'],
+                speed=emotion_settings['speed']
+            )['wav']
+        elif has_voice_sample:
+            # Generate with voice cloning
+            wav = self.model.tts(
+                text=text,
+                speaker_wav=voice_sample_path,
+                language="en",
+                speed=emotion_settings['speed']
+            )
+        else:
+            # Generate without voice cloning
+            wav = self.model.tts(
+                text=text,
+                language="en",
+                speed=emotion_settings['speed']
+            )
+        
+        return wav
+    
+    def _waveform_to_wav_bytes(self, wav, sample_rate: int) -> bytes:
+        """
+        Encode a float waveform as 16-bit PCM WAV in memory
+        
+        Args:
+            wav: Float samples in [-1, 1] (list or ndarray) as returned by TTS.tts
+            sample_rate: Output sample rate of the synthesizer
+            
+        Returns:
+            Audio bytes in WAV format
+        """
+        pcm = float_to_pcm16(wav)
+        
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(sample_rate)
+            wav_file.writeframes(pcm.tobytes())
+        return buffer.getvalue()
+    
     def _get_cache_key(self, text: str, agent_type: str, emotion: str) -> str:
-        """Generate cache key for audio"""
-        content = f"{text}:{agent_type}:{emotion}"
-        return hashlib.md5(content.encode()).hexdigest()
+        """Generate cache key for audio (includes model and speed so changes never serve stale audio)"""
+        speed = self.emotion_presets.get(emotion, self.emotion_presets['neutral'])['speed']
+        content = f"{self.model_name}:{speed}:{text}:{agent_type}:{emotion}"
+        return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _get_from_cache(self, key: str, agent_type: str, emotion: str) -> Optional[Tuple[bytes, Dict]]:
+        """Look up audio in the memory tier, then the disk tier"""
+        with self._cache_lock:
+            value = self.audio_cache.get(key)
+            if value is not None:
+                self.audio_cache.move_to_end(key)
+                return value
+        
+        path = self.disk_cache_dir / f"{key}.wav"
+        try:
+            audio_bytes = path.read_bytes()
+            os.utime(path)  # Mark as recently used for disk eviction
+        except OSError:
+            return None
+        
+        value = (audio_bytes, {
+            'agent_type': agent_type,
+            'emotion': emotion,
+            'emotion_settings': self.emotion_presets.get(emotion, self.emotion_presets['neutral']),
+            'cached': True,
+            'cache_tier': 'disk'
+        })
+        self._add_to_memory_cache(key, value)
+        return value
     
     def _add_to_cache(self, key: str, value: Tuple[bytes, Dict]):
-        """Add audio to cache with size limit"""
-        if len(self.audio_cache) >= self.cache_size:
-            # Remove oldest item
-            self.audio_cache.popitem(last=False)
+        """Add audio to both cache tiers"""
+        self._add_to_memory_cache(key, value)
+        self._add_to_disk_cache(key, value[0])
+    
+    def _add_to_memory_cache(self, key: str, value: Tuple[bytes, Dict]):
+        """Add audio to the memory tier, evicting least recently used entries by total bytes"""
+        size = len(value[0])
+        if size > self.cache_max_bytes:
+            return
         
-        self.audio_cache[key] = value
+        with self._cache_lock:
+            previous = self.audio_cache.pop(key, None)
+            if previous is not None:
+                self._cache_bytes -= len(previous[0])
+            
+            self.audio_cache[key] = value
+            self._cache_bytes += size
+            while self._cache_bytes > self.cache_max_bytes:
+                _, (evicted_bytes, _) = self.audio_cache.popitem(last=False)
+                self._cache_bytes -= len(evicted_bytes)
+    
+    def _add_to_disk_cache(self, key: str, audio_bytes: bytes):
+        """Write audio to the disk tier atomically, evicting least recently used files by total bytes"""
+        tmp_path = None
+        try:
+            self.disk_cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self.disk_cache_dir / f"{key}.wav"
+            try:
+                replaced_bytes = path.stat().st_size
+            except OSError:
+                replaced_bytes = 0
+            
+            # A private temp file per write, so workers sharing the directory never
+            # publish each other's partial writes
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(audio_bytes)
+            os.replace(tmp_path, path)
+            tmp_path = None
+            
+            with self._cache_lock:
+                stale = (
+                    self._disk_cache_bytes is None
+                    or time.monotonic() - self._disk_cache_scanned_at > DISK_CACHE_RESCAN_SECONDS
+                )
+                if not stale:
+                    self._disk_cache_bytes += len(audio_bytes) - replaced_bytes
+                
+                if stale or self._disk_cache_bytes > self.disk_cache_max_bytes:
+                    self._reconcile_disk_cache()
+        except OSError as e:
+            logger.warning(f"Could not write TTS audio cache entry {key}: {e}")
+            if tmp_path:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+    
+    def _scan_disk_cache(self) -> List[Tuple[Path, int, float]]:
+        """List (path, size, mtime) for each audio file currently in the disk tier"""
+        entries = []
+        for path in self.disk_cache_dir.glob('*.wav'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # Evicted by another worker mid-scan
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+    
+    def _reconcile_disk_cache(self):
+        """
+        Re-measure the disk tier and remove least recently used files until it fits its budget
+        
+        Other workers write to the same directory, so the running byte count is
+        only a trigger; eviction works from a fresh scan of what is on disk.
+        """
+        entries = self._scan_disk_cache()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= self.disk_cache_max_bytes:
+                break
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                continue
+            total -= size
+        self._disk_cache_bytes = total
+        self._disk_cache_scanned_at = time.monotonic()
     
     def _fallback_tts(self, text: str) -> Tuple[bytes, Dict[str, Any]]:
         """Fallback TTS when Coqui is not available"""
@@ -341,38 +794,23 @@ class CoquiTTSService:
             Optimized audio bytes
         """
         try:
-            # Create temporary files for processing
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_in:
-                tmp_in.write(audio_bytes)
-                tmp_in.flush()
-                
-                # Load audio
-                waveform, sample_rate = torchaudio.load(tmp_in.name)
-                os.unlink(tmp_in.name)
-            
-            # Convert to mono if stereo
-            if waveform.shape[0] > 1:
-                waveform = torch.mean(waveform, dim=0, keepdim=True)
-            
-            # Resample to 8kHz
-            if sample_rate != 8000:
-                resampler = torchaudio.transforms.Resample(sample_rate, 8000)
-                waveform = resampler(waveform)
-            
-            # Save as μ-law encoded
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_out:
-                torchaudio.save(
-                    tmp_out.name, 
-                    waveform, 
-                    8000,
-                    encoding='ULAW',
-                    bits_per_sample=8
-                )
-                
-                with open(tmp_out.name, 'rb') as f:
-                    optimized_bytes = f.read()
-                
-                os.unlink(tmp_out.name)
+            # Decode 16-bit PCM WAV in memory
+            with wave.open(io.BytesIO(audio_bytes), 'rb') as reader:
+                sample_rate = reader.getframerate()
+                channels = reader.getnchannels()
+                sample_width = reader.getsampwidth()
+                frames = reader.readframes(reader.getnframes())
+            
+            if sample_width != 2:
+                raise ValueError(f"Unsupported sample width: {sample_width * 8}-bit")
+            
+            # Downmix to mono and convert to float in one pass over the frames
+            samples = np.frombuffer(frames, dtype='<i2').reshape(-1, channels).mean(axis=1, dtype=np.float32)
+            samples *= 1.0 / 32768.0
+            
+            # Resample to 8kHz and save as μ-law encoded
+            samples = resample_to_twilio(samples, sample_rate)
+            optimized_bytes = mulaw_wav(mulaw_encode(float_to_pcm16(samples)))
             
             logger.info(f"Optimized audio for Twilio: {len(audio_bytes)} -> {len(optimized_bytes)} bytes")
             return optimized_bytes
@@ -392,23 +830,11 @@ class CoquiTTSService:
         Returns:
             Emotion key
         """
-        # Billing agents should be more empathetic
-        if agent_type == 'billing' and call_state.get('customer_frustrated', False):
-            return 'empathetic'
-        
-        # Sales agents should be more excited
-        if agent_type == 'sales' and call_state.get('interest_level', 0) > 0.7:
-            return 'excited'
-        
-        # Support agents should be calm and reassuring
-        if agent_type == 'support':
-            return 'calm'
-        
-        # Scheduling agents should be neutral and professional
-        if agent_type == 'scheduling':
-            return 'neutral'
-        
-        return 'neutral'
+        return _decide_emotion(
+            agent_type,
+            bool(call_state.get('customer_frustrated', False)),
+            call_state.get('interest_level', 0) > 0.7
+        )
     
     def create_voice_profile(self, audio_path: str, profile_name: str) -> bool:
         """
@@ -431,8 +857,10 @@ class CoquiTTSService:
                 logger.error(f"Audio file not found: {audio_path}")
                 return False
             
-            # Store voice sample path
+            # Store voice sample path, dropping any embedding from a previous sample
             self.voice_samples[profile_name] = audio_path
+            with self.embeddings_lock:
+                self.voice_embeddings.pop(profile_name, None)
             
             # Precompute embedding
             self._get_voice_embedding(profile_name, audio_path)
@@ -453,6 +881,7 @@ class CoquiTTSService:
             'voice_profiles': list(self.voice_samples.keys()),
             'cache_stats': {
                 'size': len(self.audio_cache),
+                'bytes': self._cache_bytes,
                 'hits': self.cache_hits,
                 'misses': self.cache_misses,
                 'hit_rate': self.cache_hits / (self.cache_hits + self.cache_misses) if (self.cache_hits + self.cache_misses) > 0 else 0
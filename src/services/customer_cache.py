@@ -0,0 +1,64 @@
+"""
+Customer Lookup Cache - Bounded phone number to customer id cache for call setup
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class CustomerIdCache:
+    """
+    Thread-safe LRU cache mapping phone numbers to customer ids with a TTL
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, phone_number: str) -> Optional[int]:
+        """
+        Get the cached customer id for a phone number, if present and fresh
+        """
+        with self._lock:
+            entry = self._entries.get(phone_number)
+            if entry is None:
+                return None
+
+            customer_id, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[phone_number]
+                return None
+
+            self._entries.move_to_end(phone_number)
+            return customer_id
+
+    def set(self, phone_number: str, customer_id: int) -> None:
+        """
+        Cache the customer id for a phone number, evicting the least recently used entry
+        """
+        with self._lock:
+            self._entries[phone_number] = (customer_id, time.monotonic() + self.ttl)
+            self._entries.move_to_end(phone_number)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, phone_number: str) -> None:
+        """
+        Drop the cached entry for a phone number
+        """
+        with self._lock:
+            self._entries.pop(phone_number, None)
+
+    def clear(self) -> None:
+        """
+        Drop all cached entries
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+# Global cache shared by call sessions
+customer_id_cache = CustomerIdCache()
@@ -4,12 +4,23 @@ Enhanced AI Agent Brain - Improved conversation processing for natural phone cal
 import os
 import logging
 import json
+import re
 import time
-from typing import Dict, Any, List, Optional, Tuple
-from datetime import datetime
+import threading
+from typing import Callable, Dict, Any, Iterable, List, Optional, Sequence, Tuple
+from datetime import datetime, timezone
 import openai
-from collections import deque
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
 from sqlalchemy.orm import Session
+from src.utils.http_client import shared_http_client
+
+# orjson parses and serializes several times faster than json; optional
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Try to import knowledge base if available
 try:
@@ -21,25 +32,51 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Most recent conversation messages sent to the model each turn
+HISTORY_MESSAGES = 10
+
+SENTIMENT_SCORES = {"positive": 1, "neutral": 0, "negative": -1}
+
+# Number of recent turns averaged by get_recent_sentiment()
+SENTIMENT_WINDOW = 5
+
+# Lower temperature for critical phases, higher for discovery/rapport building
+PHASE_TEMPERATURES = {
+    'greeting': 0.8,
+    'discovery': 0.8,
+    'resolution': 0.6,
+    'closing': 0.6
+}
+
 class ConversationState:
     """Tracks conversation state and context"""
     
     def __init__(self, call_sid: str):
         self.call_sid = call_sid
-        self.started_at = datetime.utcnow()
+        self.started_at = datetime.now(timezone.utc)
         self.turn_count = 0
         self.context = {}  # Key facts mentioned
         self.intents = []  # Detected intents
         self.entities = {}  # Extracted entities
-        self.sentiment_history = deque(maxlen=5)  # Recent sentiment
+        # Recent sentiment scores as a ring buffer with a running sum
+        self._sent_ring = [0] * SENTIMENT_WINDOW
+        self._sent_idx = 0
+        self._sent_sum = 0
+        self._sent_n = 0
+        # Recent (role, content) messages; twice the prompt window so older turns
+        # can stand in for repeated assistant lines that are left out
+        self.history = deque(maxlen=HISTORY_MESSAGES * 2)
         self.clarification_needed = False
         self.topic_stack = []  # Topics being discussed
         self.interruption_context = None
         self.conversation_phase = "greeting"  # greeting, discovery, resolution, closing
+        self.last_active = time.monotonic()
         
     def update(self, user_input: str, ai_response: str, analysis: Dict):
         """Update conversation state with new turn"""
         self.turn_count += 1
+        self.history.append(("user", user_input))
+        self.history.append(("assistant", ai_response))
         
         # Update from analysis
         if 'intent' in analysis:
@@ -47,7 +84,7 @@ class ConversationState:
         if 'entities' in analysis:
             self.entities.update(analysis['entities'])
         if 'sentiment' in analysis:
-            self.sentiment_history.append(analysis['sentiment'])
+            self._record_sentiment(SENTIMENT_SCORES.get(analysis['sentiment'], 0))
         if 'topic' in analysis:
             self._update_topic(analysis['topic'])
         if 'phase' in analysis:
@@ -61,13 +98,20 @@ class ConversationState:
         elif not self.topic_stack:
             self.topic_stack.append(new_topic)
             
+    def _record_sentiment(self, score: int):
+        """Overwrite the oldest ring slot, keeping the running sum in step"""
+        self._sent_sum += score - self._sent_ring[self._sent_idx]
+        self._sent_ring[self._sent_idx] = score
+        self._sent_idx = (self._sent_idx + 1) % SENTIMENT_WINDOW
+        if self._sent_n < SENTIMENT_WINDOW:
+            self._sent_n += 1
+            
     def get_recent_sentiment(self) -> str:
         """Get overall recent sentiment"""
-        if not self.sentiment_history:
+        if not self._sent_n:
             return "neutral"
         
-        sentiment_scores = {"positive": 1, "neutral": 0, "negative": -1}
-        avg_score = sum(sentiment_scores.get(s, 0) for s in self.sentiment_history) / len(self.sentiment_history)
+        avg_score = self._sent_sum / self._sent_n
         
         if avg_score > 0.3:
             return "positive"
@@ -75,6 +119,121 @@ class ConversationState:
             return "negative"
         return "neutral"
 
+def _json_loads(text: str) -> Any:
+    return orjson.loads(text) if orjson else json.loads(text)
+
+def _json_dumps(value: Any) -> str:
+    if orjson:
+        try:
+            return orjson.dumps(value).decode()
+        except TypeError:
+            pass  # e.g. non-string keys; the stdlib encoder coerces them
+    return json.dumps(value)
+
+# Per-call tracking is bounded: at most this many calls, dropped once idle past their TTL
+MAX_TRACKED_CALLS = 10000
+CONVERSATION_STATE_TTL = 3600  # seconds
+RESPONSE_TIME_TTL = 600  # seconds
+
+def _evict_stale_calls(entries: OrderedDict, timestamp_of: Callable[[Any], float], cutoff: float):
+    """Drop per-call entries that went idle or overflow MAX_TRACKED_CALLS, oldest first"""
+    while entries and (
+        len(entries) > MAX_TRACKED_CALLS
+        or timestamp_of(next(iter(entries.values()))) < cutoff
+    ):
+        entries.popitem(last=False)
+
+# Voice post-processing: markdown characters to drop, and formal phrases to contract
+# (capitalized and lowercase forms) in a single regex pass
+MARKDOWN_STRIP = str.maketrans('', '', '*_#')
+CONTRACTION_PAIRS = (
+    ("I will", "I'll"),
+    ("I am", "I'm"),
+    ("You are", "You're"),
+    ("It is", "It's"),
+    ("That is", "That's"),
+    ("We are", "We're"),
+    ("They are", "They're"),
+    ("Cannot", "Can't"),
+    ("Do not", "Don't"),
+    ("Would not", "Wouldn't"),
+    ("Could not", "Couldn't")
+)
+CONTRACTIONS = dict(CONTRACTION_PAIRS)
+CONTRACTIONS.update((formal.lower(), casual.lower()) for formal, casual in CONTRACTION_PAIRS)
+CONTRACTIONS_RE = re.compile(r'\b(?:' + '|'.join(re.escape(formal) for formal in CONTRACTIONS) + r')\b')
+
+# Input analysis: shorter utterances use the keyword analysis, and LLM results
+# for this many distinct utterances are reused
+MIN_WORDS_FOR_LLM_ANALYSIS = 4
+ANALYSIS_CACHE_SIZE = 512
+ANALYSIS_WAIT_SECONDS = 3.5  # Analysis call timeout plus queueing slack
+
+# Knowledge-base retrievals reused for repeated utterances; the TTL bounds how
+# long a knowledge update can take to show up
+KB_CONTEXT_CACHE_SIZE = 256
+KB_CONTEXT_TTL = 300  # seconds
+
+# Keyword patterns for the fallback analysis (substring matches)
+NEGATIVE_INPUT_RE = re.compile('angry|frustrated|upset|terrible')
+POSITIVE_INPUT_RE = re.compile('great|perfect|excellent|thank')
+REQUEST_INPUT_RE = re.compile('want|need|like|please')
+
+# Phase-specific instructions
+PHASE_PROMPTS = {
+    'greeting': "Be warm and welcoming. Quickly understand their need.",
+    'discovery': "Ask clarifying questions. Show you're listening.",
+    'resolution': "Provide clear solutions. Confirm understanding.",
+    'closing': "Summarize next steps. End positively."
+}
+
+# Sentiment-aware adjustments
+SENTIMENT_PROMPTS = {
+    'negative': "Be extra empathetic and patient. Acknowledge their frustration.",
+    'positive': "Match their positive energy. Build on the momentum.",
+    'neutral': "Be professional and helpful."
+}
+
+@lru_cache(maxsize=1024)
+def _compose_prompt(base_prompt: str, phase: str, sentiment: str) -> str:
+    """System prompt up to (not including) the per-turn line"""
+    return f"""{base_prompt}
+
+CONVERSATION GUIDELINES:
+- You're on a phone call. Keep responses under 2 sentences.
+- {PHASE_PROMPTS.get(phase, '')}
+- {SENTIMENT_PROMPTS.get(sentiment, '')}
+- Use natural speech patterns (contractions, simple words).
+- Never use lists, bullet points, or formal language.
+- If unsure, ask for clarification naturally.
+- Current phase: {phase}"""
+
+class CompiledAgent:
+    """Per-agent settings resolved once instead of read from agent_config every turn"""
+    
+    __slots__ = ('agent_id', 'base_prompt', 'guidelines')
+    
+    def __init__(self, agent_id: Any, base_prompt: str):
+        self.agent_id = agent_id
+        self.base_prompt = base_prompt
+        # Guidelines for every known phase and sentiment, formatted up front
+        self.guidelines = {
+            (phase, sentiment): _compose_prompt(base_prompt, phase, sentiment)
+            for phase in PHASE_PROMPTS
+            for sentiment in SENTIMENT_PROMPTS
+        }
+    
+    def system_prompt(self, phase: str, sentiment: str, turn_count: int) -> str:
+        guidelines = self.guidelines.get((phase, sentiment))
+        if guidelines is None:
+            guidelines = _compose_prompt(self.base_prompt, phase, sentiment)
+        return f"{guidelines}\n- Turn {turn_count} of the conversation"
+
+@lru_cache(maxsize=256)
+def _compile_agent(agent_id: Any, base_prompt: str) -> CompiledAgent:
+    # Keyed by the prompt itself, so an edited agent config compiles afresh
+    return CompiledAgent(agent_id, base_prompt)
+
 class EnhancedAgentBrain:
     """
     Enhanced AI processing engine for natural voice conversations
@@ -87,7 +246,8 @@ class EnhancedAgentBrain:
         if api_key:
             self.openai_client = openai.OpenAI(
                 api_key=api_key,
-                base_url="https://openrouter.ai/api/v1"
+                base_url="https://openrouter.ai/api/v1",
+                http_client=shared_http_client
             )
         else:
             self.openai_client = None
@@ -100,28 +260,64 @@ class EnhancedAgentBrain:
         # Conversation settings
         self.max_tokens = 120  # Shorter for natural speech
         self.temperature = 0.8  # More natural variation
-        self.conversation_states = {}  # Track state per call
+        self.conversation_states = OrderedDict()  # Track state per call, least recently active first
+        self._states_lock = threading.Lock()
         
         # Interruption handling
         self.interruption_threshold = 0.5  # seconds
-        self.last_response_time = {}
+        self.last_response_time = OrderedDict()  # Oldest response first
+        
+        # Input analysis runs here while the knowledge base is queried on the caller's thread
+        self._analysis_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="input-analysis")
+        
+        # LLM analyses of recent utterances, least recently used first
+        self._analysis_cache = OrderedDict()
+        self._analysis_cache_lock = threading.Lock()
+        
+        # Knowledge-base contexts by (agent id, utterance): (context, expiry)
+        self._kb_context_cache = OrderedDict()
+        self._kb_cache_lock = threading.Lock()
+        
+        # Analyses started from a transcript before the turn is processed, per call
+        self._prefetched_analysis = OrderedDict()  # call_sid -> (normalized text, Future, started), oldest first
+        self._prefetch_lock = threading.Lock()
         
     def create_conversation_state(self, call_sid: str) -> ConversationState:
         """Create a new conversation state for a call"""
         state = ConversationState(call_sid)
-        self.conversation_states[call_sid] = state
+        with self._states_lock:
+            self.conversation_states[call_sid] = state
+            self.conversation_states.move_to_end(call_sid)
+            
+            _evict_stale_calls(
+                self.conversation_states, lambda s: s.last_active, time.monotonic() - CONVERSATION_STATE_TTL
+            )
         return state
         
     def get_conversation_state(self, call_sid: str) -> Optional[ConversationState]:
         """Get conversation state for a call"""
-        return self.conversation_states.get(call_sid)
+        with self._states_lock:
+            state = self.conversation_states.get(call_sid)
+            if state is not None:
+                state.last_active = time.monotonic()
+                self.conversation_states.move_to_end(call_sid)
+        return state
+    
+    def _record_response_time(self, call_sid: str):
+        """Remember when the AI last responded on a call"""
+        now = time.time()
+        with self._states_lock:
+            self.last_response_time[call_sid] = now
+            self.last_response_time.move_to_end(call_sid)
+            
+            _evict_stale_calls(self.last_response_time, lambda t: t, now - RESPONSE_TIME_TTL)
     
     def process_conversation(
         self, 
         user_input: str, 
         call_sid: str,
         agent_config: Dict[str, Any],
-        conversation_history: List[str],
+        conversation_history: Optional[Sequence[str]] = None,
         db_session: Optional[Session] = None
     ) -> Tuple[str, Dict[str, Any]]:
         """
@@ -134,6 +330,8 @@ class EnhancedAgentBrain:
             if not self.openai_client:
                 return "I'm having trouble connecting right now. Please try again.", {"error": "No client"}
             
+            agent = _compile_agent(agent_config.get('id'), agent_config.get('system_prompt', ''))
+            
             # Get or create conversation state
             state = self.get_conversation_state(call_sid)
             if not state:
@@ -142,28 +340,24 @@ class EnhancedAgentBrain:
             # Detect interruption
             is_interruption = self._detect_interruption(call_sid, user_input)
             
-            # Analyze user input
-            analysis = self._analyze_input(user_input, state)
-            
-            # Get knowledge context if available
-            knowledge_context = None
-            if KNOWLEDGE_BASE_AVAILABLE and db_session and agent_config.get('id'):
-                try:
-                    kb = KnowledgeBase(db_session)
-                    knowledge_context = kb.get_context_for_conversation(
-                        agent_id=agent_config['id'],
-                        conversation_text=user_input,
-                        max_tokens=500
-                    )
-                    if knowledge_context:
-                        logger.info(f"Injected knowledge context for agent {agent_config['id']}")
-                except Exception as e:
-                    logger.error(f"Failed to get knowledge context: {e}")
+            # Analyze user input in the background (or reuse a prefetched analysis of the
+            # same transcript) while the knowledge base is queried; the lookup stays on
+            # this thread because the DB session is not thread-safe
+            analysis_future = self._take_prefetched_analysis(call_sid, user_input)
+            if analysis_future is None:
+                analysis_future = self._analysis_executor.submit(self._analyze_input, user_input, state)
+            knowledge_context = self._get_knowledge_context(user_input, agent, db_session)
+            try:
+                analysis = analysis_future.result(timeout=ANALYSIS_WAIT_SECONDS)
+            except FutureTimeoutError:
+                # Don't hold the turn for a backed-up analysis queue
+                logger.warning(f"Input analysis for {call_sid} timed out; using basic analysis")
+                analysis = self._basic_analysis(user_input)
             
             # Build enhanced messages
             messages = self._build_conversation_messages(
                 user_input, 
-                agent_config, 
+                agent, 
                 conversation_history, 
                 state, 
                 analysis,
@@ -191,7 +385,7 @@ class EnhancedAgentBrain:
             state.update(user_input, ai_response, analysis)
             
             # Update last response time
-            self.last_response_time[call_sid] = time.time()
+            self._record_response_time(call_sid)
             
             metadata = {
                 'generation_time': generation_time,
@@ -211,12 +405,91 @@ class EnhancedAgentBrain:
             logger.error(f"Error in enhanced processing: {e}")
             return "I apologize, could you repeat that please?", {"error": str(e)}
     
+    def start_prefetch(self, call_sid: str, transcript: str):
+        """
+        Start analyzing a transcript before process_conversation is called for it
+        
+        Call as soon as speech is transcribed; if the next turn's input matches the
+        transcript, process_conversation uses this analysis instead of waiting on
+        a fresh one.
+        """
+        if not self.openai_client or not transcript.strip():
+            return
+        
+        key = self._normalize_input(transcript)
+        now = time.monotonic()
+        with self._prefetch_lock:
+            current = self._prefetched_analysis.get(call_sid)
+            if current and current[0] == key:
+                return
+            future = self._analysis_executor.submit(
+                self._analyze_input, transcript, self.get_conversation_state(call_sid)
+            )
+            self._prefetched_analysis[call_sid] = (key, future, now)
+            self._prefetched_analysis.move_to_end(call_sid)
+            
+            # A call's last utterance is never claimed by a turn, so unclaimed entries age out
+            _evict_stale_calls(self._prefetched_analysis, lambda entry: entry[2], now - CONVERSATION_STATE_TTL)
+    
+    def _take_prefetched_analysis(self, call_sid: str, user_input: str):
+        """Claim the prefetched analysis future for this input, if one matches"""
+        with self._prefetch_lock:
+            entry = self._prefetched_analysis.pop(call_sid, None)
+        if entry and entry[0] == self._normalize_input(user_input):
+            return entry[1]
+        return None
+    
+    @staticmethod
+    def _normalize_input(text: str) -> str:
+        """Normalize an utterance so case and spacing differences still match"""
+        return ' '.join(text.lower().split())
+    
+    def _get_knowledge_context(
+        self,
+        user_input: str,
+        agent: CompiledAgent,
+        db_session: Optional[Session]
+    ) -> Optional[str]:
+        """Get knowledge context for the agent if available"""
+        if not (KNOWLEDGE_BASE_AVAILABLE and db_session and agent.agent_id):
+            return None
+        
+        # Repeated utterances for the same agent reuse the retrieval (and its embedding)
+        key = (agent.agent_id, self._normalize_input(user_input))
+        now = time.monotonic()
+        with self._kb_cache_lock:
+            entry = self._kb_context_cache.get(key)
+            if entry is not None and entry[1] > now:
+                self._kb_context_cache.move_to_end(key)
+                return entry[0]
+        
+        try:
+            kb = KnowledgeBase(db_session)
+            knowledge_context = kb.get_context_for_conversation(
+                agent_id=agent.agent_id,
+                conversation_text=user_input,
+                max_tokens=500
+            )
+            if knowledge_context:
+                logger.info(f"Injected knowledge context for agent {agent.agent_id}")
+        except Exception as e:
+            logger.error(f"Failed to get knowledge context: {e}")
+            return None
+        
+        with self._kb_cache_lock:
+            self._kb_context_cache[key] = (knowledge_context, now + KB_CONTEXT_TTL)
+            self._kb_context_cache.move_to_end(key)
+            if len(self._kb_context_cache) > KB_CONTEXT_CACHE_SIZE:
+                self._kb_context_cache.popitem(last=False)
+        return knowledge_context
+    
     def _detect_interruption(self, call_sid: str, user_input: str) -> bool:
         """Detect if user interrupted the AI"""
-        if call_sid not in self.last_response_time:
+        last_response = self.last_response_time.get(call_sid)
+        if last_response is None:
             return False
             
-        time_since_response = time.time() - self.last_response_time[call_sid]
+        time_since_response = time.time() - last_response
         
         # Quick interjections indicate interruption
         is_short = len(user_input.split()) < 3
@@ -226,6 +499,18 @@ class EnhancedAgentBrain:
     
     def _analyze_input(self, user_input: str, state: ConversationState) -> Dict[str, Any]:
         """Analyze user input for intent, entities, and sentiment"""
+        # Short interjections ("yes", "okay", "what?") don't need a model round trip
+        if len(user_input.split()) < MIN_WORDS_FOR_LLM_ANALYSIS:
+            return self._basic_analysis(user_input)
+        
+        # Callers repeat themselves; reuse the analysis of an identical utterance
+        key = self._normalize_input(user_input)
+        with self._analysis_cache_lock:
+            cached = self._analysis_cache.get(key)
+            if cached is not None:
+                self._analysis_cache.move_to_end(key)
+                return dict(cached)
+        
         try:
             # Quick analysis with fast model
             analysis_prompt = f"""Analyze this phone conversation input:
@@ -245,11 +530,17 @@ Response format: JSON only"""
                 messages=[{"role": "user", "content": analysis_prompt}],
                 max_tokens=150,
                 temperature=0.3,
+                response_format={"type": "json_object"},
                 timeout=3  # Quick timeout
             )
             
             try:
-                analysis = json.loads(response.choices[0].message.content)
+                analysis = _json_loads(response.choices[0].message.content)
+                if isinstance(analysis, dict):
+                    with self._analysis_cache_lock:
+                        self._analysis_cache[key] = dict(analysis)
+                        if len(self._analysis_cache) > ANALYSIS_CACHE_SIZE:
+                            self._analysis_cache.popitem(last=False)
                 return analysis
             except:
                 # Fallback to basic analysis
@@ -264,9 +555,9 @@ Response format: JSON only"""
         lower_input = user_input.lower()
         
         # Basic sentiment
-        if any(word in lower_input for word in ['angry', 'frustrated', 'upset', 'terrible']):
+        if NEGATIVE_INPUT_RE.search(lower_input):
             sentiment = 'negative'
-        elif any(word in lower_input for word in ['great', 'perfect', 'excellent', 'thank']):
+        elif POSITIVE_INPUT_RE.search(lower_input):
             sentiment = 'positive'
         else:
             sentiment = 'neutral'
@@ -274,7 +565,7 @@ Response format: JSON only"""
         # Basic intent
         if '?' in user_input:
             intent = 'question'
-        elif any(word in lower_input for word in ['want', 'need', 'like', 'please']):
+        elif REQUEST_INPUT_RE.search(lower_input):
             intent = 'request'
         else:
             intent = 'statement'
@@ -290,8 +581,8 @@ Response format: JSON only"""
     def _build_conversation_messages(
         self, 
         user_input: str,
-        agent_config: Dict[str, Any],
-        conversation_history: List[str],
+        agent: CompiledAgent,
+        conversation_history: Optional[Sequence[str]],
         state: ConversationState,
         analysis: Dict[str, Any],
         is_interruption: bool,
@@ -302,12 +593,12 @@ Response format: JSON only"""
         messages = []
         
         # Enhanced system prompt
-        system_prompt = self._build_enhanced_system_prompt(agent_config, state, analysis)
+        system_prompt = self._build_enhanced_system_prompt(agent, state, analysis)
         messages.append({"role": "system", "content": system_prompt})
         
         # Add conversation context if exists
         if state.context:
-            context_prompt = f"Known context: {json.dumps(state.context)}"
+            context_prompt = f"Known context: {_json_dumps(state.context)}"
             messages.append({"role": "system", "content": context_prompt})
         
         # Add knowledge base context if available
@@ -324,10 +615,17 @@ Response format: JSON only"""
                 "content": "The user interrupted you. Acknowledge briefly and address their concern immediately."
             })
         
-        # Add conversation history with better formatting
-        for i, msg in enumerate(conversation_history[-10:]):  # Last 10 turns
-            role = "user" if i % 2 == 0 else "assistant"
-            messages.append({"role": role, "content": msg})
+        # Add conversation history with better formatting: the caller's history when
+        # given (walked from the end, without copying it), else the call's own
+        if conversation_history:
+            start = max(len(conversation_history) - HISTORY_MESSAGES, 0)
+            newest_first = (
+                ("user" if (i - start) % 2 == 0 else "assistant", conversation_history[i])
+                for i in range(len(conversation_history) - 1, -1, -1)
+            )
+        else:
+            newest_first = reversed(state.history)
+        messages.extend(self._select_history(newest_first))
         
         # Add current input with analysis
         enhanced_input = user_input
@@ -338,61 +636,45 @@ Response format: JSON only"""
         
         return messages
     
+    def _select_history(self, newest_first: Iterable[Tuple[str, str]]) -> List[Dict[str, str]]:
+        """
+        Pick the last HISTORY_MESSAGES messages, oldest first, sending each distinct
+        assistant line only once (boilerplate like "Anything else?" recurs every few
+        turns). User messages are always kept since a repeated "yes" still answers
+        a different question.
+        """
+        selected = []
+        seen_replies = set()
+        for role, content in newest_first:
+            if role == "assistant":
+                key = self._normalize_input(content)
+                if key in seen_replies:
+                    continue
+                seen_replies.add(key)
+            selected.append({"role": role, "content": content})
+            if len(selected) == HISTORY_MESSAGES:
+                break
+        selected.reverse()
+        return selected
+    
     def _build_enhanced_system_prompt(
         self, 
-        agent_config: Dict[str, Any],
+        agent: CompiledAgent,
         state: ConversationState,
         analysis: Dict[str, Any]
     ) -> str:
         """Build enhanced system prompt based on conversation state"""
         
-        base_prompt = agent_config.get('system_prompt', '')
-        
-        # Phase-specific instructions
-        phase_prompts = {
-            'greeting': "Be warm and welcoming. Quickly understand their need.",
-            'discovery': "Ask clarifying questions. Show you're listening.",
-            'resolution': "Provide clear solutions. Confirm understanding.",
-            'closing': "Summarize next steps. End positively."
-        }
-        
-        phase_instruction = phase_prompts.get(state.conversation_phase, '')
-        
-        # Sentiment-aware adjustments
-        sentiment = state.get_recent_sentiment()
-        sentiment_prompts = {
-            'negative': "Be extra empathetic and patient. Acknowledge their frustration.",
-            'positive': "Match their positive energy. Build on the momentum.",
-            'neutral': "Be professional and helpful."
-        }
-        
-        sentiment_instruction = sentiment_prompts.get(sentiment, '')
-        
-        # Build complete prompt
-        enhanced_prompt = f"""{base_prompt}
-
-CONVERSATION GUIDELINES:
-- You're on a phone call. Keep responses under 2 sentences.
-- {phase_instruction}
-- {sentiment_instruction}
-- Use natural speech patterns (contractions, simple words).
-- Never use lists, bullet points, or formal language.
-- If unsure, ask for clarification naturally.
-- Current phase: {state.conversation_phase}
-- Turn {state.turn_count} of the conversation"""
-
-        return enhanced_prompt
+        # Only the turn number changes every turn; the rest is precompiled per phase and sentiment
+        return agent.system_prompt(str(state.conversation_phase), state.get_recent_sentiment(), state.turn_count)
     
     def _get_dynamic_temperature(self, state: ConversationState) -> float:
         """Adjust temperature based on conversation state"""
         
-        # Lower temperature for critical phases
-        if state.conversation_phase in ['resolution', 'closing']:
-            return 0.6
-        
-        # Higher temperature for discovery/rapport building
-        if state.conversation_phase in ['greeting', 'discovery']:
-            return 0.8
+        # Phase-specific temperature (the phase may be any value the analysis returned)
+        phase = state.conversation_phase
+        if isinstance(phase, str) and phase in PHASE_TEMPERATURES:
+            return PHASE_TEMPERATURES[phase]
             
         # Adjust for sentiment
         sentiment = state.get_recent_sentiment()
@@ -405,26 +687,10 @@ CONVERSATION GUIDELINES:
         """Optimize text for natural speech"""
         
         # Remove any markdown or formatting
-        text = text.replace('*', '').replace('_', '').replace('#', '')
+        text = text.translate(MARKDOWN_STRIP)
         
         # Ensure conversational tone
-        replacements = {
-            "I will": "I'll",
-            "I am": "I'm",
-            "You are": "You're",
-            "It is": "It's",
-            "That is": "That's",
-            "We are": "We're",
-            "They are": "They're",
-            "Cannot": "Can't",
-            "Do not": "Don't",
-            "Would not": "Wouldn't",
-            "Could not": "Couldn't"
-        }
-        
-        for formal, casual in replacements.items():
-            text = text.replace(formal, casual)
-            text = text.replace(formal.lower(), casual.lower())
+        text = CONTRACTIONS_RE.sub(lambda match: CONTRACTIONS[match.group(0)], text)
         
         # Add natural pauses
         if state.conversation_phase == 'discovery' and '?' in text:
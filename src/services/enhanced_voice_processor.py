@@ -3,15 +3,32 @@ Enhanced Voice Processing Service with Chatterbox Integration
 Provides emotion-aware TTS with fallback to OpenAI
 """
 import os
+import re
 import logging
 import io
 import base64
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, BinaryIO, Iterator, List, Tuple, Union
+from xml.sax.saxutils import escape
 import openai
 from .chatterbox_service import chatterbox_service
+from src.utils.http_client import shared_http_client
+from src.utils.voice_helpers import RECORDING_DOWNLOAD_TIMEOUT, optimize_text_for_speech
 
 logger = logging.getLogger(__name__)
 
+# Chunk size for streamed OpenAI TTS audio
+TTS_STREAM_CHUNK_BYTES = 4096
+
+# Twilio recording downloads are streamed in chunks over the shared connection pool
+RECORDING_CHUNK_BYTES = 65536
+
+# Sentiment keywords, each list compiled into one alternation (substring matches, as before)
+POSITIVE_WORDS_RE = re.compile('thank|great|excellent|happy|good|love|appreciate')
+NEGATIVE_WORDS_RE = re.compile('angry|frustrated|upset|problem|issue|hate|terrible')
+
+# Byte-for-byte what VoiceResponse().say(text, voice='alice') serializes to
+SAY_TWIML_TEMPLATE = '<?xml version="1.0" encoding="UTF-8"?><Response><Say voice="alice">{text}</Say></Response>'
+
 class EnhancedVoiceProcessor:
     """
     Enhanced voice processing with Chatterbox TTS and OpenAI fallback
@@ -22,16 +39,20 @@ class EnhancedVoiceProcessor:
         openrouter_key = os.getenv('OPENROUTER_API_KEY')
         openai_key = os.getenv('OPENAI_API_KEY', openrouter_key)
         
+        # Both clients share the process-wide pool with the agent brain's client
+        self.http_client = shared_http_client
+        
         if openrouter_key:
             self.openai_client = openai.OpenAI(
                 api_key=openrouter_key,
-                base_url="https://openrouter.ai/api/v1"
+                base_url="https://openrouter.ai/api/v1",
+                http_client=self.http_client
             )
         else:
             self.openai_client = None
         
         if openai_key:
-            self.tts_client = openai.OpenAI(api_key=openai_key)
+            self.tts_client = openai.OpenAI(api_key=openai_key, http_client=self.http_client)
         else:
             self.tts_client = None
         
@@ -55,8 +76,9 @@ class EnhancedVoiceProcessor:
         text: str, 
         voice: Optional[str] = None,
         agent_type: Optional[str] = 'general',
-        conversation_context: Optional[Dict] = None
-    ) -> Tuple[bytes, Dict[str, Any]]:
+        conversation_context: Optional[Dict] = None,
+        stream: bool = False
+    ) -> Tuple[Union[bytes, Iterator[bytes]], Dict[str, Any]]:
         """
         Convert text to speech with emotion awareness
         
@@ -65,9 +87,11 @@ class EnhancedVoiceProcessor:
             voice: Voice to use (for OpenAI fallback)
             agent_type: Type of agent for voice selection
             conversation_context: Conversation history for emotion detection
+            stream: Return an iterator of audio chunks instead of bytes; OpenAI
+                audio is then relayed as it arrives instead of fully buffered
             
         Returns:
-            Tuple of (audio_bytes, metadata)
+            Tuple of (audio_bytes or audio chunk iterator, metadata)
         """
         # Try Chatterbox first if enabled
         if self.use_chatterbox:
@@ -75,21 +99,20 @@ class EnhancedVoiceProcessor:
                 audio_bytes, metadata = chatterbox_service.text_to_speech(
                     text=text,
                     agent_type=agent_type,
-                    conversation_context=conversation_context
+                    conversation_context=conversation_context,
+                    twilio_optimized=os.getenv('OPTIMIZE_FOR_TWILIO', 'true').lower() == 'true'
                 )
                 
                 if audio_bytes:
-                    # Optimize for Twilio if needed
-                    if os.getenv('OPTIMIZE_FOR_TWILIO', 'true').lower() == 'true':
-                        audio_bytes = chatterbox_service.optimize_for_twilio(audio_bytes)
-                    
                     metadata['tts_engine'] = 'chatterbox'
-                    return audio_bytes, metadata
+                    return (iter([audio_bytes]) if stream else audio_bytes), metadata
                     
             except Exception as e:
                 logger.error(f"Chatterbox TTS failed: {e}. Falling back to OpenAI")
         
         # Fallback to OpenAI TTS
+        if stream:
+            return self._openai_text_to_speech_stream(text, voice)
         return self._openai_text_to_speech(text, voice)
     
     def _openai_text_to_speech(self, text: str, voice: Optional[str] = None) -> Tuple[bytes, Dict[str, Any]]:
@@ -129,16 +152,61 @@ class EnhancedVoiceProcessor:
             logger.error(f"OpenAI TTS error: {e}")
             return b"", {"error": str(e)}
     
-    def speech_to_text(self, audio_data: bytes, audio_format: str = "wav") -> str:
+    def _openai_text_to_speech_stream(self, text: str, voice: Optional[str] = None) -> Tuple[Iterator[bytes], Dict[str, Any]]:
+        """
+        OpenAI TTS fallback, relaying mp3 chunks as the API produces them
+        """
+        if not self.tts_client:
+            logger.warning("TTS client not available - returning empty audio")
+            return iter(()), {"error": "No TTS client available"}
+        
+        voice_name = voice or self.default_voice
+        
+        # Ensure text is not too long
+        if len(text) > 4000:
+            text = text[:4000] + "..."
+        
+        def chunks() -> Iterator[bytes]:
+            try:
+                with self.tts_client.audio.speech.with_streaming_response.create(
+                    model=self.tts_model,
+                    voice=voice_name,
+                    input=text,
+                    response_format="mp3"
+                ) as response:
+                    yield from response.iter_bytes(TTS_STREAM_CHUNK_BYTES)
+                logger.info(f"Streamed OpenAI TTS using voice: {voice_name}")
+            except Exception as e:
+                logger.error(f"OpenAI TTS stream error: {e}")
+        
+        metadata = {
+            'tts_engine': 'openai',
+            'voice': voice_name,
+            'model': self.tts_model,
+            'text_length': len(text),
+            'streaming': True
+        }
+        return chunks(), metadata
+    
+    def speech_to_text(
+        self,
+        audio_data: Union[bytes, BinaryIO],
+        audio_format: str = "wav",
+        call_sid: Optional[str] = None
+    ) -> str:
         """
         Convert speech to text using OpenAI Whisper
+        
+        audio_data may be raw bytes or a file-like object, which is uploaded
+        as-is without copying. When call_sid is given, analysis of the transcript starts right away so
+        it is ready by the time the turn reaches the agent brain.
         """
         try:
             if not self.openai_client:
                 logger.warning("STT client not available")
                 return ""
             
-            audio_file = io.BytesIO(audio_data)
+            audio_file = io.BytesIO(audio_data) if isinstance(audio_data, (bytes, bytearray)) else audio_data
             audio_file.name = f"audio.{audio_format}"
             
             transcript = self.openai_client.audio.transcriptions.create(
@@ -149,6 +217,11 @@ class EnhancedVoiceProcessor:
             
             transcribed_text = transcript.strip()
             logger.info(f"Transcribed: {transcribed_text}")
+            
+            if call_sid and transcribed_text:
+                from .enhanced_agent_brain import enhanced_agent_brain
+                enhanced_agent_brain.start_prefetch(call_sid, transcribed_text)
+            
             return transcribed_text
             
         except Exception as e:
@@ -166,9 +239,6 @@ class EnhancedVoiceProcessor:
         Create TwiML response with Chatterbox audio for Twilio
         """
         try:
-            from twilio.twiml.voice_response import VoiceResponse
-            response = VoiceResponse()
-            
             # Generate audio with emotion awareness
             audio_bytes, metadata = self.text_to_speech(
                 text=text,
@@ -185,15 +255,11 @@ class EnhancedVoiceProcessor:
                 
                 # TODO: Implement audio serving endpoint
                 # audio_url = self._upload_audio_to_cdn(audio_bytes)
-                # response.play(audio_url)
-                
-                # Temporary fallback
-                response.say(text, voice='alice')
-            else:
-                # Use Twilio's built-in TTS
-                response.say(text, voice='alice')
+                # Build with VoiceResponse once the response carries a <Play>
             
-            return str(response)
+            # Use Twilio's built-in TTS (also the temporary Chatterbox fallback);
+            # a single <Say> is interpolated rather than built through the SDK
+            return SAY_TWIML_TEMPLATE.format(text=escape(text))
             
         except Exception as e:
             logger.error(f"Error creating TwiML audio response: {e}")
@@ -215,17 +281,14 @@ class EnhancedVoiceProcessor:
         if not messages:
             return {'sentiment': 'neutral', 'confidence': 0.0}
         
-        # Simple sentiment analysis based on keywords
-        positive_words = ['thank', 'great', 'excellent', 'happy', 'good', 'love', 'appreciate']
-        negative_words = ['angry', 'frustrated', 'upset', 'problem', 'issue', 'hate', 'terrible']
-        
+        # Simple sentiment analysis based on keywords (distinct keywords per message)
         positive_count = 0
         negative_count = 0
         
         for msg in messages[-5:]:  # Look at last 5 messages
             text_lower = msg.get('content', '').lower()
-            positive_count += sum(1 for word in positive_words if word in text_lower)
-            negative_count += sum(1 for word in negative_words if word in text_lower)
+            positive_count += len(set(POSITIVE_WORDS_RE.findall(text_lower)))
+            negative_count += len(set(NEGATIVE_WORDS_RE.findall(text_lower)))
         
         if negative_count > positive_count:
             return {'sentiment': 'negative', 'confidence': 0.7}
@@ -234,6 +297,19 @@ class EnhancedVoiceProcessor:
         else:
             return {'sentiment': 'neutral', 'confidence': 0.5}
     
+    def analyze_conversation_sentiment_batch(self, conversations: List[list]) -> List[Dict[str, Any]]:
+        """
+        Analyze sentiment for many conversations at once (e.g. historical call analytics)
+        
+        Args:
+            conversations: List of message lists, as passed to analyze_conversation_sentiment
+            
+        Returns:
+            One sentiment result per conversation, in order
+        """
+        analyze = self.analyze_conversation_sentiment
+        return [analyze(messages) for messages in conversations]
+    
     def get_voice_settings(self, agent_type: str) -> Dict[str, Any]:
         """
         Get voice settings for specific agent type
@@ -263,21 +339,29 @@ class EnhancedVoiceProcessor:
             'use_chatterbox': self.use_chatterbox
         }
     
-    def process_twilio_recording(self, recording_url: str) -> str:
+    def process_twilio_recording(self, recording_url: str, call_sid: Optional[str] = None) -> str:
         """
         Process Twilio recording URL and transcribe
+        
+        Pass the recording webhook's CallSid so the transcript's analysis is
+        prefetched for the call's next turn.
         """
         try:
-            import requests
-            
-            response = requests.get(recording_url)
-            if response.status_code == 200:
-                audio_data = response.content
-                return self.speech_to_text(audio_data, "wav")
-            else:
-                logger.error(f"Failed to download recording: {response.status_code}")
-                return ""
+            # Stream straight into the upload buffer rather than holding a second copy
+            with self.http_client.stream(
+                "GET", recording_url, follow_redirects=True, timeout=RECORDING_DOWNLOAD_TIMEOUT
+            ) as response:
+                if response.status_code != 200:
+                    logger.error(f"Failed to download recording: {response.status_code}")
+                    return ""
                 
+                audio_file = io.BytesIO()
+                for chunk in response.iter_bytes(RECORDING_CHUNK_BYTES):
+                    audio_file.write(chunk)
+            
+            audio_file.seek(0)
+            return self.speech_to_text(audio_file, "wav", call_sid=call_sid)
+            
         except Exception as e:
             logger.error(f"Error processing Twilio recording: {e}")
             return ""
@@ -286,23 +370,7 @@ class EnhancedVoiceProcessor:
         """
         Optimize text for better speech synthesis
         """
-        optimized = text.replace("&", "and")
-        optimized = optimized.replace("@", "at")
-        optimized = optimized.replace("#", "number")
-        optimized = optimized.replace("$", "dollars")
-        optimized = optimized.replace("%", "percent")
-        
-        # Add pauses for better flow
-        optimized = optimized.replace(". ", ". <break time='0.5s'/> ")
-        optimized = optimized.replace("! ", "! <break time='0.5s'/> ")
-        optimized = optimized.replace("? ", "? <break time='0.5s'/> ")
-        
-        # Limit length
-        if len(optimized) > 500:
-            sentences = optimized.split('. ')
-            optimized = '. '.join(sentences[:3]) + '.'
-        
-        return optimized
+        return optimize_text_for_speech(text)
 
 # Create enhanced processor instance
 enhanced_voice_processor = EnhancedVoiceProcessor()
\ No newline at end of file
@@ -3,16 +3,67 @@ Optional TTS Service - Graceful handling of Chatterbox TTS and fallback to OpenA
 """
 import os
 import logging
-from typing import Optional, Dict, Any, Tuple, Union
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional, Dict, Any, Iterator, List, NoReturn, Tuple, Union
 import tempfile
+from src.utils.tts_cache import tts_audio_cache
 
 logger = logging.getLogger(__name__)
 
+# Display names for log messages, keyed by backend
+BACKEND_NAMES = {'coqui': 'Coqui', 'chatterbox': 'Chatterbox', 'openai': 'OpenAI'}
+
+OPENAI_TTS_MODEL = "tts-1"
+
+# Chunk size for streamed OpenAI TTS audio
+TTS_STREAM_CHUNK_BYTES = 4096
+
+# Longest a request waits for background initialization before trying the backends itself
+READY_WAIT_SECONDS = 30
+
+# Longest Coqui initialization waits for its background model load; a load
+# still running after this is left to finish while requests use it
+COQUI_READY_TIMEOUT = 10  # seconds
+
+# Prompts synthesized concurrently by text_to_speech_many
+TTS_BATCH_WORKERS = 4
+
+# Copied into the metadata returned when no TTS service is available
+SYSTEM_FALLBACK_METADATA = {
+    'tts_service': 'system_fallback',
+    'error': 'No TTS services available',
+    'recommendation': 'Configure OPENAI_API_KEY or install Chatterbox dependencies'
+}
+
+def _packages_installed(packages: Tuple[str, ...]) -> Tuple[Tuple[str, bool], ...]:
+    # find_spec locates a top-level package without running its code (no torch/CUDA init)
+    return tuple((package, importlib.util.find_spec(package) is not None) for package in packages)
+
+@lru_cache(maxsize=1)
+def _probe_coqui_deps() -> Tuple[Tuple[str, bool], ...]:
+    return _packages_installed(('torch', 'torchaudio', 'numpy', 'librosa', 'TTS'))
+
+@lru_cache(maxsize=1)
+def _probe_chatterbox_deps() -> Tuple[Tuple[str, bool], ...]:
+    return _packages_installed(('torch', 'torchaudio', 'numpy', 'chatterbox'))
+
 class OptionalTTSService:
     """
     TTS service that gracefully handles Chatterbox dependencies and provides fallbacks
     """
     
+    # OpenAI voice for each agent type
+    OPENAI_VOICES = {
+        'general': 'alloy',
+        'billing': 'nova',
+        'support': 'echo',
+        'sales': 'fable',
+        'scheduling': 'shimmer'
+    }
+    
     def __init__(self):
         self.coqui_available = False
         self.chatterbox_available = False
@@ -23,41 +74,84 @@ class OptionalTTSService:
         self.use_coqui = os.getenv('USE_COQUI', 'true').lower() == 'true'
         self.use_chatterbox = os.getenv('USE_CHATTERBOX', 'false').lower() == 'true'
         self.optimize_for_twilio = os.getenv('OPTIMIZE_FOR_TWILIO', 'true').lower() == 'true'
+        self.background_init = os.getenv('TTS_BACKGROUND_INIT', 'true').lower() == 'true'
         
-        # Initialize available services
-        self._initialize_services()
-    
-    def _initialize_services(self):
-        """Initialize available TTS services"""
-        
-        # Try to initialize Coqui if requested
-        if self.use_coqui:
-            try:
-                self._initialize_coqui()
-                self.coqui_available = True
-                logger.info("✅ Coqui TTS initialized successfully")
-            except Exception as e:
-                logger.warning(f"⚠️ Coqui TTS not available: {e}")
-                logger.info("🔄 Will try other TTS services")
+        # Backends are initialized on first use rather than at import time;
+        # each has its own lock so a slow model load doesn't block the others
+        self._init_locks = {
+            'coqui': threading.Lock(),
+            'chatterbox': threading.Lock(),
+            'openai': threading.Lock()
+        }
+        self._initialized = set()  # Backends whose initialization has been attempted
         
-        # Try to initialize Chatterbox if requested and Coqui not available
-        if self.use_chatterbox and not self.coqui_available:
-            try:
-                self._initialize_chatterbox()
-                self.chatterbox_available = True
-                logger.info("✅ Chatterbox TTS initialized successfully")
-            except Exception as e:
-                logger.warning(f"⚠️ Chatterbox TTS not available: {e}")
+        self._status_skeleton = None  # Built on the first get_service_status()
         
-        # Try to initialize OpenAI TTS
+        # Warm up on a daemon thread so startup isn't blocked; requests wait on _ready
+        self._ready = threading.Event()
+        if self.background_init:
+            threading.Thread(target=self._background_warm_up, name='tts-warm-up', daemon=True).start()
+        else:
+            self._ready.set()
+    
+    def _background_warm_up(self):
         try:
-            self._initialize_openai()
-            self.openai_available = True
-            logger.info("✅ OpenAI TTS initialized successfully")
+            self.warm_up()
         except Exception as e:
-            logger.warning(f"⚠️ OpenAI TTS not available: {e}")
+            logger.error(f"TTS background initialization failed: {e}")
+        finally:
+            self._ready.set()
+    
+    def _ensure_backend(self, name: str) -> bool:
+        """
+        Initialize a TTS backend ('coqui', 'chatterbox' or 'openai') once, on demand
+        
+        Returns:
+            Whether the backend is available
+        """
+        available_attr = f'{name}_available'
+        if name in self._initialized:
+            return getattr(self, available_attr)
+        
+        with self._init_locks[name]:
+            if name not in self._initialized:
+                try:
+                    getattr(self, f'_initialize_{name}')()
+                    setattr(self, available_attr, True)
+                    logger.info(f"✅ {BACKEND_NAMES[name]} TTS initialized successfully")
+                except Exception as e:
+                    logger.warning(f"⚠️ {BACKEND_NAMES[name]} TTS not available: {e}")
+                self._initialized.add(name)
+                self._update_fallback_mode()
+        
+        return getattr(self, available_attr)
+    
+    def warm_up(self) -> str:
+        """
+        Initialize every enabled backend now instead of on first use
+        
+        The local model chain (Coqui, then Chatterbox only if Coqui is
+        unavailable) and the OpenAI client initialize concurrently, so this
+        takes as long as the slower of the two rather than their sum.
         
-        # Set fallback mode
+        Returns:
+            The active TTS service
+        """
+        def load_local_model():
+            if self.use_coqui and self._ensure_backend('coqui'):
+                return
+            if self.use_chatterbox:
+                self._ensure_backend('chatterbox')
+        
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix='tts-init') as executor:
+            futures = [executor.submit(load_local_model), executor.submit(self._ensure_backend, 'openai')]
+        for future in futures:
+            future.result()
+        
+        return self.fallback_mode
+    
+    def _update_fallback_mode(self):
+        """Set fallback mode from the backends initialized so far"""
         if self.coqui_available:
             self.fallback_mode = 'coqui'
         elif self.chatterbox_available:
@@ -66,7 +160,6 @@ class OptionalTTSService:
             self.fallback_mode = 'openai'
         else:
             self.fallback_mode = 'system'
-            logger.warning("⚠️ No TTS services available - using system fallback")
     
     def _initialize_coqui(self):
         """Initialize Coqui TTS with proper error handling"""
@@ -79,14 +172,12 @@ class OptionalTTSService:
             if not torch.cuda.is_available():
                 logger.info("CUDA not available, using CPU for Coqui TTS")
             
-            # Initialize service
+            # Initialize service, waiting for its model load rather than a fixed delay
             from src.services.coqui_tts_service import coqui_tts_service
+            if coqui_tts_service.wait_ready(timeout=COQUI_READY_TIMEOUT) is False:
+                raise Exception("Coqui TTS model failed to load")
             self.coqui_service = coqui_tts_service
             
-            # Wait a bit for background initialization
-            import time
-            time.sleep(0.5)
-            
             return True
             
         except ImportError as e:
@@ -165,20 +256,10 @@ class OptionalTTSService:
             if not api_key:
                 raise Exception("OPENAI_API_KEY not configured")
             
-            # Initialize client
+            # Initialize client; connection or key errors surface on first request
             self.openai_client = openai.OpenAI(api_key=api_key)
+            return True
             
-            # Test connection
-            try:
-                response = self.openai_client.audio.speech.create(
-                    model="tts-1",
-                    voice="alloy",
-                    input="test"
-                )
-                return True
-            except Exception as e:
-                raise Exception(f"OpenAI TTS test failed: {e}")
-                
         except ImportError:
             raise Exception("OpenAI library not installed")
     
@@ -188,8 +269,9 @@ class OptionalTTSService:
         agent_type: Optional[str] = 'general',
         emotion: Optional[str] = None,
         voice: Optional[str] = None,
-        conversation_context: Optional[Dict] = None
-    ) -> Tuple[bytes, Dict[str, Any]]:
+        conversation_context: Optional[Dict] = None,
+        stream: bool = False
+    ) -> Tuple[Union[bytes, Iterator[bytes]], Dict[str, Any]]:
         """
         Convert text to speech using the best available service
         
@@ -199,13 +281,18 @@ class OptionalTTSService:
             emotion: Emotion for Chatterbox (ignored for OpenAI)
             voice: Voice override
             conversation_context: Conversation history
+            stream: Return an iterator of audio chunks instead of bytes; OpenAI
+                audio is relayed as it arrives, local engines yield one chunk
             
         Returns:
-            Tuple of (audio_bytes, metadata)
+            Tuple of (audio_bytes or chunk iterator, metadata)
         """
         
+        if not self._ready.wait(timeout=READY_WAIT_SECONDS):
+            logger.warning("TTS background initialization still running")
+        
         # Try Coqui first if available and requested
-        if self.coqui_available and self.use_coqui:
+        if self.use_coqui and self._ensure_backend('coqui'):
             try:
                 audio_bytes, metadata = self.coqui_service.text_to_speech(
                     text=text,
@@ -220,36 +307,36 @@ class OptionalTTSService:
                         audio_bytes = self.coqui_service.optimize_for_twilio(audio_bytes)
                         metadata['optimized_for_twilio'] = True
                     
-                    return audio_bytes, metadata
+                    return (iter([audio_bytes]) if stream else audio_bytes), metadata
                     
             except Exception as e:
                 logger.error(f"Coqui TTS failed: {e}")
                 logger.info("🔄 Falling back to next available TTS")
         
-        # Try Chatterbox if available and requested
-        if self.chatterbox_available and self.use_chatterbox:
+        # Try Chatterbox if available and requested (only loaded when Coqui isn't)
+        if self.use_chatterbox and not self.coqui_available and self._ensure_backend('chatterbox'):
             try:
                 audio_bytes, metadata = self.chatterbox_service.text_to_speech(
                     text=text,
                     agent_type=agent_type,
                     emotion=emotion,
-                    conversation_context=conversation_context
+                    conversation_context=conversation_context,
+                    twilio_optimized=self.optimize_for_twilio
                 )
                 
                 if audio_bytes:
                     metadata['tts_service'] = 'chatterbox'
-                    if self.optimize_for_twilio:
-                        audio_bytes = self.chatterbox_service.optimize_for_twilio(audio_bytes)
-                        metadata['optimized_for_twilio'] = True
                     
-                    return audio_bytes, metadata
+                    return (iter([audio_bytes]) if stream else audio_bytes), metadata
                     
             except Exception as e:
                 logger.error(f"Chatterbox TTS failed: {e}")
                 logger.info("🔄 Falling back to OpenAI TTS")
         
         # Try OpenAI TTS
-        if self.openai_available:
+        if self._ensure_backend('openai'):
+            if stream:
+                return self._openai_tts_stream(text, agent_type, voice)
             try:
                 audio_bytes, metadata = self._openai_tts(text, agent_type, voice)
                 if audio_bytes:
@@ -260,30 +347,40 @@ class OptionalTTSService:
                 logger.info("🔄 Falling back to system TTS")
         
         # System fallback
-        return self._system_fallback(text)
+        audio_bytes, metadata = self._system_fallback(text)
+        return (iter(()) if stream else audio_bytes), metadata
+    
+    def text_to_speech_many(
+        self,
+        texts: List[str],
+        agent_type: Optional[str] = 'general',
+        voice: Optional[str] = None
+    ) -> List[Tuple[bytes, Dict[str, Any]]]:
+        """
+        Convert several prompts at once, e.g. greeting, disclaimer and menu at a handoff
+        
+        The requests run concurrently, so the wait is about one synthesis
+        rather than one per prompt.
+        
+        Returns:
+            One (audio_bytes, metadata) tuple per text, in order
+        """
+        if len(texts) <= 1:
+            return [self.text_to_speech(text, agent_type=agent_type, voice=voice) for text in texts]
+        
+        def synthesize(text):
+            return self.text_to_speech(text, agent_type=agent_type, voice=voice)
+        
+        with ThreadPoolExecutor(max_workers=min(len(texts), TTS_BATCH_WORKERS), thread_name_prefix='tts-batch') as executor:
+            return list(executor.map(synthesize, texts))
     
     def _openai_tts(self, text: str, agent_type: str, voice: Optional[str] = None) -> Tuple[bytes, Dict[str, Any]]:
         """OpenAI TTS implementation"""
         
-        # Voice mapping for different agents
-        voice_mapping = {
-            'general': 'alloy',
-            'billing': 'nova',
-            'support': 'echo',
-            'sales': 'fable',
-            'scheduling': 'shimmer'
-        }
-        
-        selected_voice = voice or voice_mapping.get(agent_type, 'alloy')
+        selected_voice = voice or self.OPENAI_VOICES.get(agent_type, 'alloy')
         
         try:
-            response = self.openai_client.audio.speech.create(
-                model="tts-1",
-                voice=selected_voice,
-                input=text
-            )
-            
-            audio_bytes = response.content
+            audio_bytes = self._openai_synthesize(text, selected_voice)
             
             # Optimize for Twilio if requested
             if self.optimize_for_twilio:
@@ -303,6 +400,57 @@ class OptionalTTSService:
             logger.error(f"OpenAI TTS error: {e}")
             return b"", {"error": str(e)}
     
+    def _openai_tts_stream(self, text: str, agent_type: str, voice: Optional[str] = None) -> Tuple[Iterator[bytes], Dict[str, Any]]:
+        """OpenAI TTS, relaying mp3 chunks as the API produces them"""
+        
+        selected_voice = voice or self.OPENAI_VOICES.get(agent_type, 'alloy')
+        
+        def chunks() -> Iterator[bytes]:
+            try:
+                yield from self._openai_audio_chunks(text, selected_voice)
+            except Exception as e:
+                logger.error(f"OpenAI TTS stream error: {e}")
+        
+        metadata = {
+            'tts_service': 'openai',
+            'voice': selected_voice,
+            'agent_type': agent_type,
+            'text_length': len(text),
+            'optimized_for_twilio': False,
+            'streaming': True
+        }
+        
+        return chunks(), metadata
+    
+    def _openai_synthesize(self, text: str, voice: str) -> bytes:
+        """Synthesize with OpenAI into a single buffer"""
+        return b"".join(self._openai_audio_chunks(text, voice))
+    
+    def _openai_audio_chunks(self, text: str, voice: str) -> Iterator[bytes]:
+        """Stream OpenAI TTS audio, serving repeated short phrases from the shared audio cache"""
+        cache_key = tts_audio_cache.make_key(OPENAI_TTS_MODEL, voice, "mp3", text)
+        if cache_key:
+            audio_bytes = tts_audio_cache.get(cache_key)
+            if audio_bytes is not None:
+                yield audio_bytes
+                return
+        
+        received = []
+        with self.openai_client.audio.speech.with_streaming_response.create(
+            model=OPENAI_TTS_MODEL,
+            voice=voice,
+            input=text,
+            response_format="mp3"
+        ) as response:
+            for chunk in response.iter_bytes(TTS_STREAM_CHUNK_BYTES):
+                if cache_key:
+                    received.append(chunk)
+                yield chunk
+        
+        # Only audio that arrived in full is cached
+        if received:
+            tts_audio_cache.put(cache_key, b"".join(received))
+    
     def _optimize_for_twilio_simple(self, audio_bytes: bytes) -> bytes:
         """Simple optimization for Twilio without heavy dependencies"""
         try:
@@ -317,40 +465,65 @@ class OptionalTTSService:
         """System fallback - returns empty audio with error message"""
         logger.warning("No TTS services available - using system fallback")
         
-        metadata = {
-            'tts_service': 'system_fallback',
-            'error': 'No TTS services available',
-            'text': text[:100] + ('...' if len(text) > 100 else ''),
-            'recommendation': 'Configure OPENAI_API_KEY or install Chatterbox dependencies'
-        }
+        # The text excerpt is only worth building when debugging
+        if logger.isEnabledFor(logging.DEBUG):
+            return b"", {**SYSTEM_FALLBACK_METADATA, 'text': text[:100] + ('...' if len(text) > 100 else '')}
         
-        return b"", metadata
+        return b"", dict(SYSTEM_FALLBACK_METADATA)
     
-    def get_service_status(self) -> Dict[str, Any]:
-        """Get status of all TTS services"""
-        status = {
+    def _build_status_skeleton(self) -> Dict[str, Dict[str, Any]]:
+        """Status fields that don't change while the process runs"""
+        return {
             'coqui': {
-                'available': self.coqui_available,
                 'enabled': self.use_coqui,
                 'dependencies': self._check_coqui_dependencies()
             },
             'chatterbox': {
-                'available': self.chatterbox_available,
                 'enabled': self.use_chatterbox,
                 'dependencies': self._check_chatterbox_dependencies()
             },
             'openai': {
-                'available': self.openai_available,
                 'configured': bool(os.getenv('OPENAI_API_KEY'))
             },
-            'active_service': self.fallback_mode,
             'optimization': {
                 'twilio_optimization': self.optimize_for_twilio
             }
         }
+    
+    def get_service_status(self, include_stats: bool = True) -> Dict[str, Any]:
+        """
+        Get status of all TTS services
+        
+        Static fields are built once and shared between calls (treat them as
+        read-only); health checks polling this can skip the Coqui stats.
+        """
+        if self._status_skeleton is None:
+            self._status_skeleton = self._build_status_skeleton()
+        skeleton = self._status_skeleton
+        
+        status = {
+            'coqui': {
+                'available': self.coqui_available,
+                'initialized': 'coqui' in self._initialized,
+                **skeleton['coqui']
+            },
+            'chatterbox': {
+                'available': self.chatterbox_available,
+                'initialized': 'chatterbox' in self._initialized,
+                **skeleton['chatterbox']
+            },
+            'openai': {
+                'available': self.openai_available,
+                'initialized': 'openai' in self._initialized,
+                **skeleton['openai']
+            },
+            'active_service': self.fallback_mode,
+            'initializing': not self._ready.is_set(),
+            'optimization': skeleton['optimization']
+        }
         
         # Add Coqui-specific stats if available
-        if self.coqui_available:
+        if include_stats and self.coqui_available:
             try:
                 status['coqui']['stats'] = self.coqui_service.get_stats()
             except:
@@ -359,66 +532,27 @@ class OptionalTTSService:
         return status
     
     def _check_coqui_dependencies(self) -> Dict[str, bool]:
-        """Check Coqui TTS dependencies"""
-        deps = {}
-        
-        for package in ['torch', 'torchaudio', 'numpy', 'librosa']:
-            try:
-                __import__(package)
-                deps[package] = True
-            except ImportError:
-                deps[package] = False
-        
-        try:
-            from TTS.api import TTS
-            deps['TTS'] = True
-        except ImportError:
-            deps['TTS'] = False
-        
-        return deps
+        """Check Coqui TTS dependencies (probed once per process)"""
+        return dict(_probe_coqui_deps())
     
     def _check_chatterbox_dependencies(self) -> Dict[str, bool]:
-        """Check Chatterbox dependencies"""
-        deps = {}
-        
-        for package in ['torch', 'torchaudio', 'numpy']:
-            try:
-                __import__(package)
-                deps[package] = True
-            except ImportError:
-                deps[package] = False
+        """Check Chatterbox dependencies (probed once per process)"""
+        return dict(_probe_chatterbox_deps())
+    
+    def install_chatterbox_dependencies(self) -> NoReturn:
+        """
+        Chatterbox dependencies are not installed at runtime
         
-        try:
-            from chatterbox.tts import ChatterboxTTS
-            deps['chatterbox'] = True
-        except ImportError:
-            deps['chatterbox'] = False
+        pip-installing multi-GB ML packages into a running service blocks for
+        minutes and fails in read-only images; install them at build time.
         
-        return deps
-    
-    def install_chatterbox_dependencies(self) -> bool:
-        """Attempt to install Chatterbox dependencies"""
-        try:
-            import subprocess
-            import sys
-            
-            # Install ML dependencies
-            subprocess.check_call([
-                sys.executable, "-m", "pip", "install", 
-                "torch>=2.0.0", "torchaudio>=2.0.0", "numpy>=1.24.0"
-            ])
-            
-            # Install Chatterbox
-            subprocess.check_call([
-                sys.executable, "-m", "pip", "install", "chatterbox-tts"
-            ])
-            
-            logger.info("✅ Chatterbox dependencies installed successfully")
-            return True
-            
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Failed to install Chatterbox dependencies: {e}")
-            return False
+        Raises:
+            NotImplementedError: Always, with the installation guide
+        """
+        raise NotImplementedError(
+            "Install TTS dependencies when building the image "
+            "('pip install -r requirements-ml.txt'), then restart.\n" + self.create_installation_guide()
+        )
     
     def create_installation_guide(self) -> str:
         """Create installation guide for missing dependencies"""
@@ -3,21 +3,71 @@ SMS Follow-up Service - Professional SMS messaging after calls
 """
 import os
 import logging
-from typing import Dict, Any, Optional
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Union
+from requests.adapters import HTTPAdapter
+from twilio.http.http_client import TwilioHttpClient
 from twilio.rest import Client
+from urllib3.util.retry import Retry
 from src.models.call import SMSLog, AgentConfig, db
 from src.models.customer import Customer
 
 logger = logging.getLogger(__name__)
 
+# Concurrent Twilio requests when sending a batch of follow-ups
+SMS_BATCH_WORKERS = 16
+
+# Single-segment SMS length, and the message used when a summary can't fit
+SMS_MAX_LENGTH = 160
+SHORT_FOLLOW_UP_MESSAGE = "Thanks for calling A Killion Voice! We discussed your inquiry and provided assistance. Reply or call (978) 643-2034 for more help."
+
+# Agent SMS templates rarely change, so lookups are cached (and refreshed after this long)
+AGENT_TEMPLATE_TTL = 300  # seconds
+
+# Detached copy of the AgentConfig fields SMS needs, safe to share across threads
+AgentSMSTemplate = namedtuple('AgentSMSTemplate', ['agent_type', 'sms_template'])
+
+# Stands in for the summary when formatting an agent template, to split it into prefix and suffix
+SUMMARY_MARKER = "\x00"
+
 class SMSService:
     """
     Professional SMS follow-up service for A Killion Voice
     """
     
+    # Default templates by agent type, as the text before and after the summary
+    DEFAULT_TEMPLATE_PARTS = {
+        'billing': (
+            "Thanks for calling A Killion Voice about your billing inquiry. ",
+            " If you need further assistance with your account, please reply or call us back at (978) 643-2034."
+        ),
+        'support': (
+            "Thanks for calling A Killion Voice technical support. ",
+            " We've provided troubleshooting steps to help resolve your issue. Reply if you need more assistance!"
+        ),
+        'sales': (
+            "Thanks for your interest in A Killion Voice services! ",
+            " I'll follow up with more information about our solutions. Questions? Just reply or call (978) 643-2034!"
+        ),
+        'scheduling': (
+            "Thanks for scheduling with A Killion Voice! ",
+            " We'll send appointment confirmations and reminders. Reply to make changes or call (978) 643-2034."
+        ),
+        'general': (
+            "Thanks for calling A Killion Voice! ",
+            " We're here to help whenever you need us. Reply to this message or call (978) 643-2034 for assistance."
+        )
+    }
+    
     def __init__(self):
         self.twilio_client = None
         self.from_number = None
+        self.messaging_service_sid = None
+        self._agent_templates = {}  # agent_type -> (AgentSMSTemplate or None, expires_at)
+        self._agent_templates_lock = threading.Lock()
         self._initialize_twilio()
     
     def _initialize_twilio(self):
@@ -28,9 +78,18 @@ class SMSService:
             account_sid = os.getenv('TWILIO_ACCOUNT_SID')
             auth_token = os.getenv('TWILIO_AUTH_TOKEN')
             self.from_number = os.getenv('TWILIO_PHONE_NUMBER', '+19786432034')
+            # A Messaging Service lets Twilio pick the sender from its number pool
+            self.messaging_service_sid = os.getenv('TWILIO_MESSAGING_SERVICE_SID')
             
             if account_sid and auth_token:
-                self.twilio_client = Client(account_sid, auth_token)
+                # Keep enough pooled keep-alive connections for a full send_batch,
+                # and retry failed connects (which never reach Twilio, so can't double-send)
+                http_client = TwilioHttpClient()
+                http_client.session.mount('https://', HTTPAdapter(
+                    pool_maxsize=SMS_BATCH_WORKERS,
+                    max_retries=Retry(total=3, backoff_factor=0.2)
+                ))
+                self.twilio_client = Client(account_sid, auth_token, http_client=http_client)
                 logger.info("SMS service initialized successfully")
             else:
                 logger.warning("Twilio credentials not found - SMS service in test mode")
@@ -60,7 +119,7 @@ class SMSService:
         """
         try:
             # Get agent configuration for SMS template
-            agent_config = AgentConfig.query.filter_by(agent_type=agent_type).first()
+            agent_config = self._get_agent_config(agent_type)
             
             # Generate SMS message
             message_body = self._generate_sms_message(
@@ -107,10 +166,124 @@ class SMSService:
                 'error': str(e)
             }
     
+    def send_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Send many follow-ups at once, e.g. a nightly reminder run
+        
+        Messages go out concurrently and all SMS logs are written in a single
+        commit, instead of one Twilio round-trip and commit per message.
+        
+        Args:
+            items: Dicts with the keyword arguments of send_call_follow_up
+            
+        Returns:
+            One sending result per item, in order
+        """
+        if not items:
+            return []
+        
+        try:
+            # Agent templates come from the cache; one query covers every customer
+            agent_configs = {
+                agent_type: self._get_agent_config(agent_type)
+                for agent_type in {item['agent_type'] for item in items}
+            }
+            phone_numbers = {item['to_number'] for item in items}
+            customers = {
+                customer.phone_number: customer
+                for customer in Customer.query.filter(Customer.phone_number.in_(phone_numbers))
+            }
+            
+            message_bodies = [
+                self._generate_sms_message(
+                    item['agent_type'],
+                    agent_configs.get(item['agent_type']),
+                    item['conversation_summary'],
+                    item.get('call_duration')
+                )
+                for item in items
+            ]
+        except Exception as e:
+            logger.error(f"Error preparing SMS batch: {e}")
+            return [{'success': False, 'error': str(e)} for _ in items]
+        
+        # The Twilio client is thread-safe; database work stays on this thread
+        with ThreadPoolExecutor(max_workers=SMS_BATCH_WORKERS) as executor:
+            results = list(executor.map(
+                self._send_sms, (item['to_number'] for item in items), message_bodies
+            ))
+        
+        try:
+            sms_logs = []
+            updated_customers = {}
+            for item, message_body, result in zip(items, message_bodies, results):
+                if not result['success']:
+                    continue
+                customer = customers.get(item['to_number'])
+                sms_logs.append(SMSLog(
+                    call_id=item['call_id'],
+                    sms_sid=result.get('sms_sid'),
+                    to_number=item['to_number'],
+                    message_body=message_body,
+                    status='sent',
+                    template_type=item['agent_type'],
+                    agent_type=item['agent_type'],
+                    customer_id=customer.id if customer else None
+                ))
+                if customer:
+                    updated_customers[customer.id] = customer
+            
+            db.session.bulk_save_objects(sms_logs)
+            db.session.commit()
+            
+            logger.info(f"SMS batch sent: {len(sms_logs)} of {len(items)} follow-ups")
+            
+            # Update customer stats once per customer
+            for customer in updated_customers.values():
+                customer.update_stats()
+            db.session.commit()
+        except Exception as e:
+            # The messages are already out; report their results regardless
+            logger.error(f"Error logging SMS batch: {e}")
+            db.session.rollback()
+        
+        return results
+    
+    def _get_agent_config(self, agent_type: str) -> Optional[AgentSMSTemplate]:
+        """
+        Get the SMS template for an agent type, querying the database at most
+        once per AGENT_TEMPLATE_TTL
+        """
+        now = time.monotonic()
+        with self._agent_templates_lock:
+            entry = self._agent_templates.get(agent_type)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+        
+        config = AgentConfig.query.filter_by(agent_type=agent_type).first()
+        template = AgentSMSTemplate(config.agent_type, config.sms_template) if config else None
+        
+        with self._agent_templates_lock:
+            self._agent_templates[agent_type] = (template, now + AGENT_TEMPLATE_TTL)
+        return template
+    
+    def invalidate_agent_config(self, agent_type: Optional[str] = None):
+        """
+        Drop cached SMS templates after an agent config change
+        
+        Args:
+            agent_type: Agent type to drop, or None for all
+        """
+        with self._agent_templates_lock:
+            if agent_type is None:
+                self._agent_templates.clear()
+            else:
+                self._agent_templates.pop(agent_type, None)
+    
     def _generate_sms_message(
         self, 
         agent_type: str, 
-        agent_config: Optional[AgentConfig], 
+        agent_config: Optional[Union[AgentConfig, AgentSMSTemplate]], 
         summary: str, 
         duration: Optional[int]
     ) -> str:
@@ -130,40 +303,40 @@ class SMSService:
         if agent_config and agent_config.sms_template:
             template = agent_config.sms_template
             
-            # Replace placeholders
-            message = template.format(
-                summary=summary,
+            if duration:
+                minutes, seconds = divmod(duration, 60)
+                duration_text = f"{minutes}:{seconds:02d}"
+            else:
+                duration_text = "a few minutes"
+            
+            # Replace placeholders, keeping the text around the summary apart
+            parts = template.format(
+                summary=SUMMARY_MARKER,
                 company_name="A Killion Voice",
-                duration=f"{duration//60}:{duration%60:02d}" if duration else "a few minutes"
-            )
+                duration=duration_text
+            ).split(SUMMARY_MARKER)
+            
+            if len(parts) != 2:
+                # No single summary slot to shorten
+                message = summary.join(parts)
+                return message if len(message) <= SMS_MAX_LENGTH else SHORT_FOLLOW_UP_MESSAGE
+            prefix, suffix = parts
         else:
             # Default templates by agent type
-            templates = {
-                'billing': f"Thanks for calling A Killion Voice about your billing inquiry. {summary} If you need further assistance with your account, please reply or call us back at (978) 643-2034.",
-                
-                'support': f"Thanks for calling A Killion Voice technical support. {summary} We've provided troubleshooting steps to help resolve your issue. Reply if you need more assistance!",
-                
-                'sales': f"Thanks for your interest in A Killion Voice services! {summary} I'll follow up with more information about our solutions. Questions? Just reply or call (978) 643-2034!",
-                
-                'scheduling': f"Thanks for scheduling with A Killion Voice! {summary} We'll send appointment confirmations and reminders. Reply to make changes or call (978) 643-2034.",
-                
-                'general': f"Thanks for calling A Killion Voice! {summary} We're here to help whenever you need us. Reply to this message or call (978) 643-2034 for assistance."
-            }
-            
-            message = templates.get(agent_type, templates['general'])
+            prefix, suffix = self.DEFAULT_TEMPLATE_PARTS.get(agent_type, self.DEFAULT_TEMPLATE_PARTS['general'])
         
         # Ensure message is within SMS limits (160 characters for single SMS)
-        if len(message) > 160:
+        template_length = len(prefix) + len(suffix)
+        if template_length + len(summary) > SMS_MAX_LENGTH:
             # Truncate summary if message is too long
-            max_summary_length = 160 - len(message) + len(summary) - 10  # Leave buffer
+            max_summary_length = SMS_MAX_LENGTH - template_length - 10  # Leave buffer
             if max_summary_length > 20:
-                truncated_summary = summary[:max_summary_length] + "..."
-                message = message.replace(summary, truncated_summary)
+                summary = summary[:max_summary_length] + "..."
             else:
                 # Use shorter default message
-                message = f"Thanks for calling A Killion Voice! We discussed your inquiry and provided assistance. Reply or call (978) 643-2034 for more help."
+                return SHORT_FOLLOW_UP_MESSAGE
         
-        return message
+        return prefix + summary + suffix
     
     def _send_sms(self, to_number: str, message_body: str) -> Dict[str, Any]:
         """
@@ -186,11 +359,18 @@ class SMSService:
             }
         
         try:
-            message = self.twilio_client.messages.create(
-                body=message_body,
-                from_=self.from_number,
-                to=to_number
-            )
+            if self.messaging_service_sid:
+                message = self.twilio_client.messages.create(
+                    body=message_body,
+                    messaging_service_sid=self.messaging_service_sid,
+                    to=to_number
+                )
+            else:
+                message = self.twilio_client.messages.create(
+                    body=message_body,
+                    from_=self.from_number,
+                    to=to_number
+                )
             
             return {
                 'success': True,
@@ -0,0 +1,101 @@
+"""
+TTS Micro-batching - Coalesces concurrent text-to-speech requests onto one generation thread
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Optional
+
+import torch
+
+
+class TTSBatcher:
+    """
+    Coalesces concurrent TTS requests onto one generation thread.
+
+    Requests arriving within max_wait of each other are collected (up to
+    max_batch_size) and grouped by voice and emotion settings; each group is
+    generated back to back on a dedicated CUDA stream when one is available,
+    and each result is released as soon as its own kernels finish.
+    """
+
+    def __init__(self, max_batch_size: int = 8, max_wait: float = 0.015):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._stream = None
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._started:
+            return
+        with self._start_lock:
+            if self._started:
+                return
+            thread = threading.Thread(target=self._run, name="tts-batcher", daemon=True)
+            thread.start()
+            self._started = True
+
+    def submit(
+        self,
+        generate: Callable[[str, Optional[str], Dict[str, Any]], Any],
+        text: str,
+        voice: Optional[str],
+        settings: Dict[str, Any]
+    ) -> Future:
+        """
+        Queue a generation request and return a future for its result
+
+        generate(text, voice, settings) is called on the batcher thread; requests
+        with the same generate, voice and settings are grouped together.
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((generate, text, voice, settings, future))
+        return future
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            groups: Dict[tuple, list] = {}
+            for job in self._collect_batch():
+                generate, _, voice, settings, _ = job
+                key = (generate, voice, tuple(sorted(settings.items())))
+                groups.setdefault(key, []).append(job)
+
+            for jobs in groups.values():
+                self._run_group(jobs)
+
+    def _run_group(self, jobs: list):
+        if torch.cuda.is_available() and self._stream is None:
+            self._stream = torch.cuda.Stream()
+
+        with torch.cuda.stream(self._stream) if self._stream is not None else nullcontext():
+            for generate, text, voice, settings, future in jobs:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    wav = generate(text, voice, settings)
+                    # Wait only for this utterance's kernels, then hand it back so the
+                    # caller encodes it while the next one in the group is generated
+                    if self._stream is not None:
+                        self._stream.record_event().synchronize()
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(wav)
@@ -5,8 +5,12 @@ import os
 import logging
 import io
 import base64
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional, Dict, Any
 import openai
+from src.utils.http_client import shared_http_client
+from src.utils.tts_cache import tts_audio_cache
+from src.utils.voice_helpers import RECORDING_DOWNLOAD_TIMEOUT, VOICE_IO_WORKERS, optimize_text_for_speech
 
 logger = logging.getLogger(__name__)
 
@@ -24,14 +28,15 @@ class VoiceProcessor:
         if openrouter_key:
             self.openai_client = openai.OpenAI(
                 api_key=openrouter_key,
-                base_url="https://openrouter.ai/api/v1"
+                base_url="https://openrouter.ai/api/v1",
+                http_client=shared_http_client
             )
         else:
             self.openai_client = None
         
         # For TTS, we need direct OpenAI API (optional)
         if openai_key:
-            self.tts_client = openai.OpenAI(api_key=openai_key)
+            self.tts_client = openai.OpenAI(api_key=openai_key, http_client=shared_http_client)
         else:
             self.tts_client = None
         
@@ -39,6 +44,9 @@ class VoiceProcessor:
         self.speech_model = 'whisper-1'
         self.tts_model = 'tts-1'  # or tts-1-hd for higher quality
         
+        # TTS and STT round-trips run here so callers can overlap them with other work
+        self._io_executor = ThreadPoolExecutor(max_workers=VOICE_IO_WORKERS, thread_name_prefix="voice-io")
+        
     def text_to_speech(self, text: str, voice: Optional[str] = None) -> bytes:
         """
         Convert text to speech using OpenAI TTS
@@ -61,6 +69,12 @@ class VoiceProcessor:
             if len(text) > 4000:
                 text = text[:4000] + "..."
             
+            cache_key = tts_audio_cache.make_key(self.tts_model, voice_name, "mp3", text)
+            if cache_key:
+                cached = tts_audio_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            
             response = self.tts_client.audio.speech.create(
                 model=self.tts_model,
                 voice=voice_name,
@@ -69,12 +83,23 @@ class VoiceProcessor:
             )
             
             logger.info(f"Generated TTS for: {text[:50]}... using voice: {voice_name}")
+            if cache_key:
+                tts_audio_cache.put(cache_key, response.content)
             return response.content
             
         except Exception as e:
             logger.error(f"TTS error: {e}")
             return b""
     
+    def text_to_speech_async(self, text: str, voice: Optional[str] = None) -> Future:
+        """
+        Start text_to_speech on the voice I/O pool
+        
+        Returns:
+            Future resolving to the audio bytes
+        """
+        return self._io_executor.submit(self.text_to_speech, text, voice)
+    
     def speech_to_text(self, audio_data: bytes, audio_format: str = "wav") -> str:
         """
         Convert speech to text using OpenAI Whisper
@@ -110,6 +135,15 @@ class VoiceProcessor:
             logger.error(f"STT error: {e}")
             return ""
     
+    def speech_to_text_async(self, audio_data: bytes, audio_format: str = "wav") -> Future:
+        """
+        Start speech_to_text on the voice I/O pool
+        
+        Returns:
+            Future resolving to the transcribed text
+        """
+        return self._io_executor.submit(self.speech_to_text, audio_data, audio_format)
+    
     def create_twiml_audio_response(self, text: str, voice: Optional[str] = None) -> str:
         """
         Create TwiML response with audio for Twilio
@@ -199,10 +233,10 @@ class VoiceProcessor:
             Transcribed text
         """
         try:
-            import requests
-            
-            # Download recording from Twilio
-            response = requests.get(recording_url)
+            # Download recording from Twilio over the shared keep-alive pool
+            response = shared_http_client.get(
+                recording_url, follow_redirects=True, timeout=RECORDING_DOWNLOAD_TIMEOUT
+            )
             if response.status_code == 200:
                 audio_data = response.content
                 return self.speech_to_text(audio_data, "wav")
@@ -224,25 +258,7 @@ class VoiceProcessor:
         Returns:
             Optimized text for TTS
         """
-        # Remove or replace problematic characters
-        optimized = text.replace("&", "and")
-        optimized = optimized.replace("@", "at")
-        optimized = optimized.replace("#", "number")
-        optimized = optimized.replace("$", "dollars")
-        optimized = optimized.replace("%", "percent")
-        
-        # Add pauses for better speech flow
-        optimized = optimized.replace(". ", ". <break time='0.5s'/> ")
-        optimized = optimized.replace("! ", "! <break time='0.5s'/> ")
-        optimized = optimized.replace("? ", "? <break time='0.5s'/> ")
-        
-        # Ensure reasonable length
-        if len(optimized) > 500:
-            # Split into sentences and take first few
-            sentences = optimized.split('. ')
-            optimized = '. '.join(sentences[:3]) + '.'
-        
-        return optimized
+        return optimize_text_for_speech(text)
     
     def get_voice_settings(self, agent_type: str) -> Dict[str, str]:
         """
@@ -5,9 +5,14 @@ import os
 import logging
 import io
 import base64
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional, Dict, Any, Tuple
 import openai
 from .chatterbox_service import chatterbox_service
+from src.utils.http_client import shared_http_client
+from src.utils.tts_cache import tts_audio_cache
+from src.utils.voice_helpers import RECORDING_DOWNLOAD_TIMEOUT, VOICE_IO_WORKERS, optimize_text_for_speech
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +46,13 @@ class UnifiedVoiceProcessor:
         self.tts_model = tts_model
         self.optimize_for_twilio = optimize_for_twilio
         
+        # TTS and STT round-trips run here so callers can overlap them with other work
+        self._io_executor = ThreadPoolExecutor(max_workers=VOICE_IO_WORKERS, thread_name_prefix="voice-io")
+        
+        # OpenAI TTS requests in flight by audio cache key, so identical concurrent requests share one
+        self._inflight_tts = {}  # cache key -> Future
+        self._inflight_lock = threading.Lock()
+        
         # Initialize Chatterbox if enabled and available
         if self.use_chatterbox and self.chatterbox_service:
             try:
@@ -54,7 +66,7 @@ class UnifiedVoiceProcessor:
         """Legacy initialization for TTS client"""
         openai_key = os.getenv('OPENAI_API_KEY') or os.getenv('OPENROUTER_API_KEY')
         if openai_key:
-            return openai.OpenAI(api_key=openai_key)
+            return openai.OpenAI(api_key=openai_key, http_client=shared_http_client)
         return None
     
     def _init_legacy_stt_client(self):
@@ -63,7 +75,8 @@ class UnifiedVoiceProcessor:
         if openrouter_key:
             return openai.OpenAI(
                 api_key=openrouter_key,
-                base_url="https://openrouter.ai/api/v1"
+                base_url="https://openrouter.ai/api/v1",
+                http_client=shared_http_client
             )
         return None
     
@@ -91,12 +104,11 @@ class UnifiedVoiceProcessor:
                 audio_bytes, metadata = chatterbox_service.text_to_speech(
                     text=text,
                     agent_type=agent_type,
-                    conversation_context=conversation_context
+                    conversation_context=conversation_context,
+                    twilio_optimized=os.getenv('OPTIMIZE_FOR_TWILIO', 'true').lower() == 'true'
                 )
                 
                 if audio_bytes:
-                    if os.getenv('OPTIMIZE_FOR_TWILIO', 'true').lower() == 'true':
-                        audio_bytes = chatterbox_service.optimize_for_twilio(audio_bytes)
                     return audio_bytes
                     
             except Exception as e:
@@ -121,13 +133,11 @@ class UnifiedVoiceProcessor:
                 audio_bytes, metadata = chatterbox_service.text_to_speech(
                     text=text,
                     agent_type=agent_type,
-                    conversation_context=conversation_context
+                    conversation_context=conversation_context,
+                    twilio_optimized=os.getenv('OPTIMIZE_FOR_TWILIO', 'true').lower() == 'true'
                 )
                 
                 if audio_bytes:
-                    if os.getenv('OPTIMIZE_FOR_TWILIO', 'true').lower() == 'true':
-                        audio_bytes = chatterbox_service.optimize_for_twilio(audio_bytes)
-                    
                     metadata['tts_engine'] = 'chatterbox'
                     return audio_bytes, metadata
                     
@@ -137,65 +147,98 @@ class UnifiedVoiceProcessor:
         # Fallback to OpenAI TTS
         return self._openai_text_to_speech(text, voice)
     
+    def text_to_speech_async(
+        self,
+        text: str,
+        voice: Optional[str] = None,
+        agent_type: Optional[str] = 'general',
+        conversation_context: Optional[Dict] = None
+    ) -> Future:
+        """
+        Start text_to_speech on the voice I/O pool; the Future resolves to the audio bytes
+        """
+        return self._io_executor.submit(self.text_to_speech, text, voice, agent_type, conversation_context)
+    
     def _openai_text_to_speech_legacy(self, text: str, voice: Optional[str] = None) -> bytes:
         """Legacy OpenAI TTS interface"""
+        audio_bytes, _ = self._openai_text_to_speech(text, voice)
+        return audio_bytes
+    
+    def _openai_text_to_speech(self, text: str, voice: Optional[str] = None) -> Tuple[bytes, Dict[str, Any]]:
+        """Enhanced OpenAI TTS with metadata"""
         try:
             if not self.tts_client:
                 logger.warning("TTS client not available - returning empty audio")
-                return b""
+                return b"", {"error": "No TTS client available"}
             
             voice_name = voice or self.default_voice
             
             if len(text) > 4000:
                 text = text[:4000] + "..."
             
-            response = self.tts_client.audio.speech.create(
-                model=self.tts_model,
-                voice=voice_name,
-                input=text,
-                response_format="mp3"
-            )
+            metadata = {
+                'tts_engine': 'openai',
+                'voice': voice_name,
+                'model': self.tts_model,
+                'text_length': len(text),
+                'cache_hit': False
+            }
             
-            logger.info(f"Generated OpenAI TTS using voice: {voice_name}")
-            return response.content
+            cache_key = tts_audio_cache.make_key(self.tts_model, voice_name, "mp3", text)
+            if cache_key:
+                cached = tts_audio_cache.get(cache_key)
+                if cached is not None:
+                    metadata['cache_hit'] = True
+                    return cached, metadata
+            
+            audio_bytes, coalesced = self._request_openai_speech(cache_key, voice_name, text)
+            metadata['coalesced'] = coalesced
+            
+            return audio_bytes, metadata
             
         except Exception as e:
             logger.error(f"OpenAI TTS error: {e}")
-            return b""
+            return b"", {"error": str(e)}
     
-    def _openai_text_to_speech(self, text: str, voice: Optional[str] = None) -> Tuple[bytes, Dict[str, Any]]:
-        """Enhanced OpenAI TTS with metadata"""
-        try:
-            if not self.tts_client:
-                logger.warning("TTS client not available - returning empty audio")
-                return b"", {"error": "No TTS client available"}
-            
-            voice_name = voice or self.default_voice
-            
-            if len(text) > 4000:
-                text = text[:4000] + "..."
+    def _request_openai_speech(self, cache_key: Optional[str], voice_name: str, text: str) -> Tuple[bytes, bool]:
+        """
+        Call the OpenAI speech endpoint, sharing one request between concurrent callers of the same audio
+        
+        Returns the audio and whether it came from another caller's request.
+        """
+        if cache_key:
+            with self._inflight_lock:
+                pending = self._inflight_tts.get(cache_key)
+                leader = pending is None
+                if leader:
+                    pending = self._inflight_tts[cache_key] = Future()
             
+            if not leader:
+                return pending.result(), True
+        
+        try:
             response = self.tts_client.audio.speech.create(
                 model=self.tts_model,
                 voice=voice_name,
                 input=text,
                 response_format="mp3"
             )
-            
             logger.info(f"Generated OpenAI TTS using voice: {voice_name}")
             
-            metadata = {
-                'tts_engine': 'openai',
-                'voice': voice_name,
-                'model': self.tts_model,
-                'text_length': len(text)
-            }
-            
-            return response.content, metadata
-            
+            if cache_key:
+                tts_audio_cache.put(cache_key, response.content)
+                pending.set_result(response.content)
+            return response.content, False
+        
         except Exception as e:
-            logger.error(f"OpenAI TTS error: {e}")
-            return b"", {"error": str(e)}
+            if cache_key:
+                pending.set_exception(e)
+            raise
+        
+        finally:
+            if cache_key:
+                with self._inflight_lock:
+                    del self._inflight_tts[cache_key]
     
     def speech_to_text(self, audio_data: bytes, audio_format: str = "wav") -> str:
         """Convert speech to text using OpenAI Whisper"""
@@ -221,6 +264,12 @@ class UnifiedVoiceProcessor:
             logger.error(f"STT error: {e}")
             return ""
     
+    def speech_to_text_async(self, audio_data: bytes, audio_format: str = "wav") -> Future:
+        """
+        Start speech_to_text on the voice I/O pool; the Future resolves to the transcribed text
+        """
+        return self._io_executor.submit(self.speech_to_text, audio_data, audio_format)
+    
     def create_twiml_audio_response(
         self, 
         text: str, 
@@ -289,9 +338,10 @@ class UnifiedVoiceProcessor:
     def process_twilio_recording(self, recording_url: str) -> str:
         """Process Twilio recording URL and transcribe"""
         try:
-            import requests
-            
-            response = requests.get(recording_url)
+            # Download recording from Twilio over the shared keep-alive pool
+            response = shared_http_client.get(
+                recording_url, follow_redirects=True, timeout=RECORDING_DOWNLOAD_TIMEOUT
+            )
             if response.status_code == 200:
                 audio_data = response.content
                 return self.speech_to_text(audio_data, "wav")
@@ -305,23 +355,7 @@ class UnifiedVoiceProcessor:
     
     def optimize_text_for_speech(self, text: str) -> str:
         """Optimize text for better speech synthesis"""
-        optimized = text.replace("&", "and")
-        optimized = optimized.replace("@", "at")
-        optimized = optimized.replace("#", "number")
-        optimized = optimized.replace("$", "dollars")
-        optimized = optimized.replace("%", "percent")
-        
-        # Add pauses for better flow
-        optimized = optimized.replace(". ", ". <break time='0.5s'/> ")
-        optimized = optimized.replace("! ", "! <break time='0.5s'/> ")
-        optimized = optimized.replace("? ", "? <break time='0.5s'/> ")
-        
-        # Limit length
-        if len(optimized) > 500:
-            sentences = optimized.split('. ')
-            optimized = '. '.join(sentences[:3]) + '.'
-        
-        return optimized
+        return optimize_text_for_speech(text)
     
     def get_available_voices(self) -> Dict[str, Any]:
         """Get list of available voices"""
@@ -18,6 +18,32 @@ from .port_config import (
     port_manager
 )
 
+from .audio_codec import (
+    TWILIO_SAMPLE_RATE,
+    float_to_pcm16,
+    mulaw_encode,
+    mulaw_wav,
+    pcm16_wav,
+    read_wav,
+    resample_to_twilio
+)
+
+from .http_client import (
+    HTTP2_AVAILABLE,
+    shared_http_client
+)
+
+from .tts_cache import (
+    TTSAudioCache,
+    tts_audio_cache
+)
+
+from .voice_helpers import (
+    RECORDING_DOWNLOAD_TIMEOUT,
+    VOICE_IO_WORKERS,
+    optimize_text_for_speech
+)
+
 __all__ = [
     'get_python_version',
     'get_recommended_socketio_config',
@@ -29,5 +55,19 @@ __all__ = [
     'get_standardized_port',
     'get_port_config',
     'standardize_ports',
-    'port_manager'
+    'port_manager',
+    'TWILIO_SAMPLE_RATE',
+    'float_to_pcm16',
+    'mulaw_encode',
+    'mulaw_wav',
+    'pcm16_wav',
+    'read_wav',
+    'resample_to_twilio',
+    'HTTP2_AVAILABLE',
+    'shared_http_client',
+    'TTSAudioCache',
+    'tts_audio_cache',
+    'RECORDING_DOWNLOAD_TIMEOUT',
+    'VOICE_IO_WORKERS',
+    'optimize_text_for_speech'
 ]
@@ -0,0 +1,128 @@
+"""
+Audio Codec Helpers - In-memory PCM, G.711 μ-law and WAV encoding for Twilio audio
+"""
+import io
+import struct
+import threading
+import wave
+from math import gcd
+from typing import Tuple
+
+import numpy as np
+
+TWILIO_SAMPLE_RATE = 8000
+
+# μ-law WAVs (format 7) carry an 18-byte fmt chunk and a fact chunk with the sample count
+_MULAW_FMT_CHUNK = b'fmt ' + struct.pack(
+    '<IHHIIHHH', 18, 7, 1, TWILIO_SAMPLE_RATE, TWILIO_SAMPLE_RATE, 1, 8, 0
+)
+
+# Per-thread float32 scratch space reused by float_to_pcm16, grown on demand
+_scratch = threading.local()
+
+def _scratch_buffer(size: int) -> np.ndarray:
+    buffer = getattr(_scratch, 'buffer', None)
+    if buffer is None or buffer.size < size:
+        buffer = np.empty(size, dtype=np.float32)
+        _scratch.buffer = buffer
+    return buffer[:size]
+
+def float_to_pcm16(samples) -> np.ndarray:
+    """
+    Convert float samples in [-1, 1] to int16 PCM
+    
+    Scaling and clipping happen in place in a reused scratch buffer, so the
+    only allocation is the returned int16 array.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    scaled = _scratch_buffer(samples.size).reshape(samples.shape)
+    np.multiply(samples, 32767.0, out=scaled)
+    np.clip(scaled, -32767.0, 32767.0, out=scaled)
+    return scaled.astype(np.int16)
+
+def _mulaw_compress(pcm: np.ndarray) -> np.ndarray:
+    """
+    G.711 μ-law compress int16 PCM (Sun reference algorithm)
+    """
+    pcm = np.asarray(pcm, dtype=np.int32)
+    sign = np.where(pcm < 0, 0x80, 0x00)
+    magnitude = np.minimum(np.abs(pcm), 32635) + 0x84
+    exponent = np.floor(np.log2(magnitude)).astype(np.int32) - 7
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8)
+
+# μ-law code for every int16 sample, ordered so a uint16 view of the PCM indexes it directly
+_MULAW_TABLE = np.roll(_mulaw_compress(np.arange(-32768, 32768)), 32768)
+
+def mulaw_encode(pcm: np.ndarray) -> bytes:
+    """
+    G.711 μ-law encode int16 PCM with a single table lookup per sample
+    """
+    pcm = np.ascontiguousarray(pcm, dtype=np.int16)
+    return _MULAW_TABLE[pcm.view(np.uint16)].tobytes()
+
+def mulaw_wav(encoded: bytes) -> bytes:
+    """
+    Wrap 8kHz mono μ-law samples in a WAV container
+    """
+    size = len(encoded)
+    padding = b'\x00' if size % 2 else b''
+    riff_size = 4 + len(_MULAW_FMT_CHUNK) + 12 + 8 + size + len(padding)
+    return b''.join((
+        b'RIFF', struct.pack('<I', riff_size), b'WAVE',
+        _MULAW_FMT_CHUNK,
+        b'fact', struct.pack('<II', 4, size),
+        b'data', struct.pack('<I', size), encoded, padding
+    ))
+
+def pcm16_wav(pcm: np.ndarray, sample_rate: int) -> bytes:
+    """
+    Wrap int16 PCM, shaped (samples,) or (channels, samples), in a WAV container
+    """
+    pcm = np.asarray(pcm, dtype=np.int16)
+    channels = 1 if pcm.ndim == 1 else pcm.shape[0]
+    data = np.ascontiguousarray(pcm.T, dtype='<i2').tobytes()  # Interleave channels
+    block_align = 2 * channels
+    return b''.join((
+        b'RIFF', struct.pack('<I', 36 + len(data)), b'WAVE',
+        b'fmt ', struct.pack('<IHHIIHH', 16, 1, channels, sample_rate, sample_rate * block_align, block_align, 16),
+        b'data', struct.pack('<I', len(data)), data
+    ))
+
+# Integer PCM sample widths readable by read_wav: numpy dtype and full-scale value
+_PCM_FORMATS = {1: (np.uint8, 128.0), 2: ('<i2', 32768.0), 4: ('<i4', 2147483648.0)}
+
+def read_wav(audio_bytes: bytes) -> Tuple[np.ndarray, int]:
+    """
+    Decode integer PCM WAV bytes into float32 samples in [-1, 1]
+    
+    Returns:
+        Tuple of (samples shaped (channels, samples), sample rate)
+    """
+    with wave.open(io.BytesIO(audio_bytes), 'rb') as reader:
+        channels = reader.getnchannels()
+        sample_width = reader.getsampwidth()
+        sample_rate = reader.getframerate()
+        frames = reader.readframes(reader.getnframes())
+    
+    if sample_width not in _PCM_FORMATS:
+        raise ValueError(f"Unsupported WAV sample width: {sample_width * 8} bits")
+    
+    dtype, full_scale = _PCM_FORMATS[sample_width]
+    samples = np.frombuffer(frames, dtype=dtype).astype(np.float32)
+    if sample_width == 1:
+        samples -= 128.0  # 8-bit WAV is unsigned
+    samples /= full_scale
+    return samples.reshape(-1, channels).T, sample_rate
+
+def resample_to_twilio(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    Resample float samples to 8kHz with a polyphase filter
+    """
+    if sample_rate == TWILIO_SAMPLE_RATE:
+        return samples
+
+    from scipy.signal import resample_poly
+
+    divisor = gcd(TWILIO_SAMPLE_RATE, sample_rate)
+    return resample_poly(samples, TWILIO_SAMPLE_RATE // divisor, sample_rate // divisor)
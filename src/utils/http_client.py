@@ -0,0 +1,22 @@
+"""
+Shared HTTP Client - One keep-alive connection pool for every OpenAI SDK client
+"""
+import httpx
+import openai
+
+# HTTP/2 lets concurrent STT, analysis and completion requests share a connection
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Idle seconds before a pooled HTTPS connection is closed; long enough to hold
+# TLS connections open across the pauses between conversational turns
+KEEPALIVE_SECONDS = 60
+
+# Global client instance, passed as http_client= to each openai.OpenAI(...)
+shared_http_client = openai.DefaultHttpxClient(
+    http2=HTTP2_AVAILABLE,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=KEEPALIVE_SECONDS)
+)
@@ -0,0 +1,105 @@
+"""
+TTS Audio Cache - Content-addressed cache for synthesized speech, in memory with an optional disk tier
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Entries kept in memory; OpenAI MP3s for short prompts are a few tens of KB each
+TTS_AUDIO_CACHE_SIZE = int(os.getenv('TTS_AUDIO_CACHE_SIZE', '512'))
+
+# Directory for the disk tier; unset keeps the cache in memory only
+TTS_AUDIO_CACHE_DIR = os.getenv('TTS_AUDIO_CACHE_DIR')
+
+# Seconds a disk entry stays valid after it was written
+TTS_AUDIO_CACHE_TTL = int(os.getenv('TTS_AUDIO_CACHE_TTL', str(7 * 24 * 3600)))
+
+# Longer texts are one-off replies rather than repeated prompts, so they are not cached
+TTS_AUDIO_CACHE_MAX_CHARS = 500
+
+class TTSAudioCache:
+    """
+    LRU cache of synthesized audio keyed by a hash of model, voice, format and text
+    """
+
+    def __init__(self, max_entries: int = TTS_AUDIO_CACHE_SIZE, disk_dir: Optional[str] = TTS_AUDIO_CACHE_DIR,
+                 disk_ttl: int = TTS_AUDIO_CACHE_TTL):
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_ttl = disk_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, voice: str, audio_format: str, text: str) -> Optional[str]:
+        """Return the cache key for a synthesis request, or None if the text is too long to cache"""
+        if len(text) > TTS_AUDIO_CACHE_MAX_CHARS:
+            return None
+        return hashlib.sha1(f"{model}|{voice}|{audio_format}|{text}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Look up audio in the memory tier, then the disk tier"""
+        with self._lock:
+            audio = self._entries.get(key)
+            if audio is not None:
+                self._entries.move_to_end(key)
+                return audio
+
+        if self.disk_dir is None:
+            return None
+
+        path = self.disk_dir / f"{key}.mp3"
+        try:
+            if time.time() - path.stat().st_mtime > self.disk_ttl:
+                path.unlink()
+                return None
+            audio = path.read_bytes()
+        except OSError:
+            return None
+
+        self._put_memory(key, audio)
+        return audio
+
+    def put(self, key: str, audio: bytes):
+        """Store audio in both tiers"""
+        if not audio:
+            return
+
+        self._put_memory(key, audio)
+        if self.disk_dir is None:
+            return
+
+        tmp_path = None
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            # A private temp file per write, so workers sharing the directory never
+            # publish each other's partial writes
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(audio)
+            os.replace(tmp_path, self.disk_dir / f"{key}.mp3")
+        except OSError as e:
+            logger.warning(f"Could not write TTS audio cache entry {key}: {e}")
+            if tmp_path:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+
+    def _put_memory(self, key: str, audio: bytes):
+        with self._lock:
+            self._entries[key] = audio
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+# Global cache instance shared by every OpenAI TTS path (voice processors and OptionalTTSService)
+tts_audio_cache = TTSAudioCache()
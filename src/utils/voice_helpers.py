@@ -0,0 +1,30 @@
+"""
+Voice Processing Helpers - Speech text preparation and I/O limits shared by the voice processors
+"""
+import re
+
+# Twilio recording downloads give up after this long
+RECORDING_DOWNLOAD_TIMEOUT = 30  # seconds
+
+# OpenAI TTS/STT requests allowed in flight at once from a processor's *_async methods
+VOICE_IO_WORKERS = 8
+
+# Symbols spoken as words, and sentence ends that get an SSML pause
+SPOKEN_SYMBOLS = str.maketrans({'&': 'and', '@': 'at', '#': 'number', '$': 'dollars', '%': 'percent'})
+SENTENCE_PAUSE_RE = re.compile(r'([.!?]) ')
+
+# Longer text is cut to its first three sentences
+MAX_SPOKEN_CHARS = 500
+
+def optimize_text_for_speech(text: str) -> str:
+    """
+    Spell out symbols, add pauses after sentences and cap the length for TTS
+    """
+    optimized = text.translate(SPOKEN_SYMBOLS)
+    optimized = SENTENCE_PAUSE_RE.sub(r"\1 <break time='0.5s'/> ", optimized)
+
+    if len(optimized) > MAX_SPOKEN_CHARS:
+        sentences = optimized.split('. ')
+        optimized = '. '.join(sentences[:3]) + '.'
+
+    return optimized
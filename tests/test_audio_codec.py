@@ -0,0 +1,57 @@
+import io
+import struct
+import wave
+import numpy as np
+from src.utils.audio_codec import float_to_pcm16, mulaw_encode, mulaw_wav, pcm16_wav, read_wav, resample_to_twilio
+
+def test_mulaw_encode_matches_g711_reference_codes():
+    """Test that silence and full-scale samples map to the G.711 μ-law codes."""
+    pcm = np.array([0, 32767, -32768, 1000, -1000], dtype=np.int16)
+    assert mulaw_encode(pcm) == bytes([0xFF, 0x80, 0x00, 0xCE, 0x4E])
+
+def test_mulaw_encode_covers_full_int16_range():
+    """Test that table-based encoding handles negative samples and keeps one byte per sample."""
+    pcm = np.array([-1, -32767, 32635, 32767], dtype=np.int16)
+    assert mulaw_encode(pcm) == bytes([0x7F, 0x00, 0x80, 0x80])
+    assert len(mulaw_encode(np.arange(-32768, 32768, dtype=np.int16))) == 65536
+
+def test_float_to_pcm16_clips_out_of_range_samples():
+    """Test that float samples outside [-1, 1] are clipped before conversion."""
+    pcm = float_to_pcm16([0.0, 2.0, -2.0])
+    assert pcm.dtype == np.int16
+    assert pcm.tolist() == [0, 32767, -32767]
+
+def test_float_to_pcm16_results_survive_scratch_reuse():
+    """Test that converting a second waveform does not alter an earlier result."""
+    first = float_to_pcm16(np.full(4, 0.5, dtype=np.float32))
+    float_to_pcm16(np.full(8, -0.5, dtype=np.float32))
+    assert first.tolist() == [16383] * 4
+
+def test_mulaw_wav_header_describes_8khz_mono_mulaw():
+    """Test that the WAV container declares format 7 at 8kHz with the sample count."""
+    wav = mulaw_wav(b'\xff' * 3)
+    assert wav[:4] == b'RIFF' and wav[8:12] == b'WAVE'
+    assert struct.unpack('<I', wav[4:8])[0] == len(wav) - 8
+    fmt_tag, channels, rate = struct.unpack('<HHI', wav[20:28])
+    assert (fmt_tag, channels, rate) == (7, 1, 8000)
+    assert wav[38:42] == b'fact' and struct.unpack('<I', wav[46:50])[0] == 3
+    assert wav[50:54] == b'data' and struct.unpack('<I', wav[54:58])[0] == 3
+    assert len(wav) % 2 == 0  # Odd-length data is padded
+
+def test_resample_to_twilio_reduces_sample_count():
+    """Test that 24kHz audio resamples to 8kHz and 8kHz passes through."""
+    samples = np.zeros(24000, dtype=np.float32)
+    assert len(resample_to_twilio(samples, 24000)) == 8000
+    assert resample_to_twilio(samples, 8000) is samples
+
+def test_pcm16_wav_round_trips_through_read_wav():
+    """Test that PCM16 WAVs parse with the stdlib reader and decode back to the samples."""
+    stereo = np.array([[0, 16384, -32768], [32767, -16384, 0]], dtype=np.int16)
+    wav = pcm16_wav(stereo, 24000)
+    with wave.open(io.BytesIO(wav), 'rb') as reader:
+        assert (reader.getnchannels(), reader.getsampwidth(), reader.getframerate(), reader.getnframes()) == (2, 2, 24000, 3)
+    samples, rate = read_wav(wav)
+    assert rate == 24000 and samples.shape == (2, 3)
+    assert samples.tolist() == [[0.0, 0.5, -1.0], [32767 / 32768, -0.5, 0.0]]
+    mono, _ = read_wav(pcm16_wav(stereo[0], 8000))
+    assert mono.shape == (1, 3)
@@ -3,7 +3,7 @@ Unit tests for authentication service
 """
 import pytest
 from datetime import datetime, timedelta
-from src.services.auth import AuthService, JWT_SECRET_KEY, JWT_ALGORITHM
+from src.services.auth import AuthService, JWT_SECRET_KEY, JWT_ALGORITHM, _encode_token
 from src.models.user import User
 import jwt
 
@@ -37,6 +37,20 @@ class TestAuthService:
         assert refresh_payload['user_id'] == user_id
         assert refresh_payload['type'] == 'refresh'
     
+    def test_generated_token_matches_pyjwt_encoding(self):
+        """Test cached HS256 signer produces the same token as jwt.encode"""
+        now = datetime.utcnow()
+        payload = {
+            'user_id': 7,
+            'type': 'access',
+            'iat': now,
+            'exp': now + timedelta(hours=1)
+        }
+        
+        token = _encode_token(payload)
+        
+        assert token == jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+    
     def test_verify_valid_token(self):
         """Test verification of valid token"""
         user_id = 1
@@ -121,6 +121,15 @@ def test_analyze_intent_exact_match_bonus(app):
         # For simplicity, let's assume the confidence reflects this score difference.
         assert analysis_exact['confidence'] > analysis_specific['confidence']
 
+def test_analyze_intent_exact_match_short_circuits(app):
+    """Test that an exact keyword owned by one agent routes with full confidence."""
+    with app.app_context():
+        analysis = call_router.analyze_intent("  Refund ")
+
+        assert analysis['agent_type'] == 'billing'
+        assert analysis['confidence'] == 1.0
+        assert analysis['matched_keywords'] == ['refund']
+
 def test_get_all_agents(app):
     """Test retrieving all agent configurations."""
     with app.app_context():
@@ -142,3 +151,12 @@ def test_get_agent_info(app):
         assert non_existent_agent_info is None
 
 # More tests could be added for update_agent_config, edge cases in scoring, etc.
+
+def test_warm_up_builds_keyword_index(app):
+    """Test that warming up indexes the loaded keywords without a routing request."""
+    with app.app_context():
+        call_router.warm_up()
+
+        _, keyword_index, _, exact_map = call_router._index_snapshot
+        assert exact_map['refund'] == ('billing',)
+        assert keyword_index[0][2] == 'sales'  # 'new product' * 3 outweighs the rest
@@ -0,0 +1,103 @@
+import threading
+import time
+from types import SimpleNamespace
+from flask import Flask
+from src.services import call_session
+from src.services.call_session import BackgroundDBWriter, CallSession
+
+def test_writer_runs_jobs_for_one_key_in_order():
+    """Test that jobs for the same call are applied in submission order."""
+    writer = BackgroundDBWriter(shards=2)
+    applied = []
+    for i in range(20):
+        # Earlier jobs are slower, so any reordering would show up
+        writer.submit('CA1', lambda i=i: (time.sleep((20 - i) / 2000), applied.append(i)))
+
+    assert writer.flush('CA1')
+    assert applied == list(range(20))
+
+def test_flush_waits_for_queued_writes():
+    """Test that flush returns only after earlier jobs ran, and times out behind a stuck job."""
+    writer = BackgroundDBWriter(shards=1)
+    applied = []
+    writer.submit('CA1', lambda: (time.sleep(0.2), applied.append('slow')))
+
+    assert writer.flush('CA1')
+    assert applied == ['slow']
+
+    release = threading.Event()
+    writer.submit('CA1', release.wait)
+    assert not writer.flush('CA1', timeout=0.05)
+    release.set()
+    assert writer.flush('CA1')
+
+def test_flush_without_jobs_returns_immediately():
+    """Test that flushing a writer that never started does not block."""
+    assert BackgroundDBWriter().flush('CA1', timeout=0)
+
+def test_session_messages_reach_the_writer_in_order():
+    """Test that a session's batched messages are persisted in conversation order."""
+    app = Flask(__name__)
+    writer = BackgroundDBWriter()
+    session = CallSession(
+        'CA1', '+15550100', agent_brain=None, call_router=None,
+        twilio_phone_number='+15550199', db_session=object(), db_writer=writer
+    )
+    session.call_record = SimpleNamespace(id=7)
+    saved = []
+    session._save_messages = lambda app, messages: (time.sleep(0.01), saved.extend(messages))
+
+    with app.app_context():
+        for turn in range(5):
+            session._queue_message('user', f'question {turn}')
+            session._queue_message('assistant', f'answer {turn}')
+        session.flush_messages()  # The last partial batch
+    assert writer.flush('CA1')
+
+    assert [(m['role'], m['content']) for m in saved] == [
+        (role, f'{kind} {turn}') for turn in range(5) for role, kind in (('user', 'question'), ('assistant', 'answer'))
+    ]
+    assert all(m['call_id'] == 7 for m in saved)
+
+class FlakyDBSession:
+    """db.session stand-in whose first inserts fail."""
+
+    def __init__(self, failures, events):
+        self.failures = failures
+        self.events = events
+
+    def execute(self, statement, rows):
+        if self.failures:
+            self.failures -= 1
+            self.events.append('failed')
+            raise RuntimeError('database is locked')
+        self.events.append('saved')
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+def test_flush_waits_for_a_retried_batch(monkeypatch):
+    """Test that a flush queued while a write is failing returns only after the retry saved it."""
+    events = []
+    monkeypatch.setattr(call_session, 'db', SimpleNamespace(session=FlakyDBSession(2, events)))
+    monkeypatch.setattr(CallSession, 'MESSAGE_RETRY_DELAY', 0.05)
+    app = Flask(__name__)
+    writer = BackgroundDBWriter()
+    session = CallSession(
+        'CA2', '+15550100', agent_brain=None, call_router=None,
+        twilio_phone_number='+15550199', db_session=object(), db_writer=writer
+    )
+    session.call_record = SimpleNamespace(id=7)
+
+    with app.app_context():
+        session._queue_message('user', 'hello')
+        session.flush_messages()
+    while not events:  # The first attempt is under way
+        time.sleep(0.001)
+    assert writer.flush('CA2')
+    events.append('flush returned')
+
+    assert events == ['failed', 'failed', 'saved', 'flush returned']
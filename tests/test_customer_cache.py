@@ -0,0 +1,35 @@
+import time
+from src.services.customer_cache import CustomerIdCache
+
+def test_get_returns_cached_customer_id():
+    """Test that a cached phone number resolves to its customer id."""
+    cache = CustomerIdCache()
+    cache.set('+15551234567', 42)
+    assert cache.get('+15551234567') == 42
+    assert cache.get('+15550000000') is None
+
+def test_least_recently_used_entry_is_evicted():
+    """Test that the cache evicts the least recently used phone number when full."""
+    cache = CustomerIdCache(maxsize=2)
+    cache.set('+1555000001', 1)
+    cache.set('+1555000002', 2)
+    cache.get('+1555000001')  # Touch so entry 2 becomes least recently used
+    cache.set('+1555000003', 3)
+
+    assert cache.get('+1555000002') is None
+    assert cache.get('+1555000001') == 1
+    assert cache.get('+1555000003') == 3
+
+def test_expired_entry_is_dropped():
+    """Test that entries older than the TTL are treated as misses."""
+    cache = CustomerIdCache(ttl=0.01)
+    cache.set('+15551234567', 42)
+    time.sleep(0.02)
+    assert cache.get('+15551234567') is None
+
+def test_invalidate_removes_entry():
+    """Test that invalidating a phone number removes its cached id."""
+    cache = CustomerIdCache()
+    cache.set('+15551234567', 42)
+    cache.invalidate('+15551234567')
+    assert cache.get('+15551234567') is None
@@ -44,6 +44,7 @@ def setup_agents_for_sms(app):
             agent.set_keywords(agent_data['keywords'])
             db.session.add(agent)
         db.session.commit()
+        sms_service.invalidate_agent_config()  # Templates were recreated
     yield
 
 def test_generate_sms_message_with_template(app):
@@ -118,6 +119,30 @@ def test_send_call_follow_up_logs_sms(app, mocker):
         assert log_entry.agent_type == agent_type
         assert summary in log_entry.message_body
 
+def test_send_batch_logs_all_sms_in_order(app, mocker):
+    """Test that send_batch returns one result per item and logs every sent SMS."""
+    with app.app_context():
+        test_call = Call(call_sid="test_sms_batch_sid", from_number="123", to_number="456", agent_type="general", status="completed")
+        db.session.add(test_call)
+        db.session.commit()
+
+        spy_send_sms = mocker.spy(sms_service, '_send_sms')
+        items = [
+            {'call_id': test_call.id, 'to_number': "+15550000001", 'agent_type': "general", 'conversation_summary': "First summary."},
+            {'call_id': test_call.id, 'to_number': "+15550000002", 'agent_type': "billing", 'conversation_summary': "Second summary.", 'call_duration': 125}
+        ]
+
+        results = sms_service.send_batch(items)
+
+        assert [r['sms_sid'] for r in results] == ['test_sms_+15550000001', 'test_sms_+15550000002']
+        assert spy_send_sms.call_count == 2
+
+        billing_log = SMSLog.query.filter_by(to_number="+15550000002").first()
+        assert billing_log is not None
+        assert billing_log.agent_type == "billing"
+        assert "Call duration: 2:05" in billing_log.message_body
+        assert SMSLog.query.filter_by(call_id=test_call.id).count() == 2
+
 def test_sms_message_truncation(app):
     """Test that long SMS messages are truncated."""
     with app.app_context():
@@ -0,0 +1,48 @@
+import threading
+import pytest
+from src.services.tts_batcher import TTSBatcher
+
+def make_generate(order, started=None, release=None):
+    def generate(text, voice, settings):
+        if started is not None:
+            started.set()
+            release.wait(5)
+        if text == 'bad':
+            raise RuntimeError('synthesis failed')
+        order.append(text)
+        return f'{voice}:{text}'
+    return generate
+
+def test_batch_groups_by_voice_and_settings_and_delivers_each_result():
+    """Test that queued jobs run grouped by voice/settings, in order, with their own results."""
+    batcher = TTSBatcher(max_batch_size=8, max_wait=0.05)
+    order = []
+    started, release = threading.Event(), threading.Event()
+    generate = make_generate(order)
+
+    # Hold the batcher thread so the next jobs are collected into one batch
+    blocker = batcher.submit(make_generate(order, started, release), 'blocker', None, {})
+    assert started.wait(5)
+    futures = [
+        batcher.submit(generate, text, voice, {'exaggeration': 0.5})
+        for text, voice in (('a1', 'alice'), ('b1', 'bob'), ('a2', 'alice'), ('b2', 'bob'))
+    ]
+    release.set()
+
+    assert blocker.result(5) == 'None:blocker'
+    assert [future.result(5) for future in futures] == ['alice:a1', 'bob:b1', 'alice:a2', 'bob:b2']
+    assert order == ['blocker', 'a1', 'a2', 'b1', 'b2']
+
+def test_generation_error_is_delivered_to_its_own_future_only():
+    """Test that a failing job raises for its caller while the rest of its group completes."""
+    batcher = TTSBatcher(max_batch_size=8, max_wait=0.05)
+    order = []
+    generate = make_generate(order)
+
+    futures = [batcher.submit(generate, text, 'alice', {}) for text in ('one', 'bad', 'two')]
+
+    assert futures[0].result(5) == 'alice:one'
+    with pytest.raises(RuntimeError, match='synthesis failed'):
+        futures[1].result(5)
+    assert futures[2].result(5) == 'alice:two'
+    assert order == ['one', 'two']
@@ -0,0 +1,31 @@
+import os
+import time
+from src.utils.tts_cache import TTS_AUDIO_CACHE_MAX_CHARS, TTSAudioCache
+
+def test_make_key_separates_voices_and_skips_long_text():
+    """Test that keys differ per voice and long texts are not cached."""
+    key = TTSAudioCache.make_key('tts-1', 'alloy', 'mp3', 'Hello')
+    assert key == TTSAudioCache.make_key('tts-1', 'alloy', 'mp3', 'Hello')
+    assert key != TTSAudioCache.make_key('tts-1', 'nova', 'mp3', 'Hello')
+    assert TTSAudioCache.make_key('tts-1', 'alloy', 'mp3', 'x' * (TTS_AUDIO_CACHE_MAX_CHARS + 1)) is None
+
+def test_memory_tier_evicts_least_recently_used():
+    """Test that reading an entry protects it from eviction."""
+    cache = TTSAudioCache(max_entries=2, disk_dir=None)
+    cache.put('a', b'1')
+    cache.put('b', b'2')
+    assert cache.get('a') == b'1'
+    cache.put('c', b'3')
+    assert cache.get('b') is None
+    assert cache.get('a') == b'1' and cache.get('c') == b'3'
+
+def test_disk_tier_survives_restart_and_expires(tmp_path):
+    """Test that disk entries are reloaded by a new cache until their TTL passes."""
+    TTSAudioCache(disk_dir=str(tmp_path)).put('k', b'mp3')
+    assert [f.name for f in tmp_path.iterdir()] == ['k.mp3']  # No temp files left behind
+    assert TTSAudioCache(disk_dir=str(tmp_path)).get('k') == b'mp3'
+
+    stale = time.time() - 10
+    os.utime(tmp_path / 'k.mp3', (stale, stale))
+    assert TTSAudioCache(disk_dir=str(tmp_path), disk_ttl=5).get('k') is None
+    assert not (tmp_path / 'k.mp3').exists()
@@ -0,0 +1,14 @@
+from src.utils.voice_helpers import optimize_text_for_speech
+
+def test_optimize_text_spells_out_symbols_and_adds_pauses():
+    """Test that symbols become words and sentence ends get an SSML pause."""
+    assert optimize_text_for_speech("Save 5% & more! Call now? Yes.") == (
+        "Save 5percent and more! <break time='0.5s'/> Call now? <break time='0.5s'/> Yes."
+    )
+
+def test_optimize_text_keeps_three_sentences_of_long_text():
+    """Test that text over the limit is cut to its first three sentences."""
+    text = ". ".join(f"Sentence {i} " + "x" * 60 for i in range(10))
+    optimized = optimize_text_for_speech(text)
+    assert optimized.count("<break") == 2  # Pauses between the kept sentences
+    assert "Sentence 3" not in optimized and optimized.endswith(".")
@@ -0,0 +1,79 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from src.services.voice_processor_unified import UnifiedVoiceProcessor
+
+CALLERS = 6
+
+class CountingLock:
+    """Lock that lets a test wait until a given number of callers have taken it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entered = threading.Condition()
+        self.count = 0
+
+    def __enter__(self):
+        self._lock.acquire()
+        with self._entered:
+            self.count += 1
+            self._entered.notify_all()
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+    def wait_for(self, count):
+        with self._entered:
+            return self._entered.wait_for(lambda: self.count >= count, timeout=5)
+
+class FakeSpeechClient:
+    """OpenAI client stub whose speech request blocks until every caller has joined it."""
+
+    def __init__(self, inflight_lock, error=None):
+        self.calls = 0
+        self.inflight_lock = inflight_lock
+        self.error = error
+        self.audio = SimpleNamespace(speech=SimpleNamespace(create=self.create))
+
+    def create(self, model, voice, input, response_format):
+        self.calls += 1
+        assert self.inflight_lock.wait_for(CALLERS)  # Followers have found this request in flight
+        if self.error:
+            raise self.error
+        return SimpleNamespace(content=input.encode())
+
+def make_processor(error=None):
+    processor = UnifiedVoiceProcessor(
+        tts_client=object(), stt_client=object(), chatterbox_service=object(), use_chatterbox=False
+    )
+    processor._inflight_lock = CountingLock()
+    processor.tts_client = FakeSpeechClient(processor._inflight_lock, error)
+    return processor
+
+def synthesize_concurrently(processor, text):
+    with ThreadPoolExecutor(max_workers=CALLERS) as executor:
+        return list(executor.map(lambda _: processor._openai_text_to_speech(text), range(CALLERS)))
+
+def test_concurrent_identical_requests_share_one_call():
+    """Test that concurrent callers of the same text get one request's audio."""
+    processor = make_processor()
+    text = f"Thanks for calling {uuid.uuid4()}"
+
+    results = synthesize_concurrently(processor, text)
+
+    assert processor.tts_client.calls == 1
+    assert all(audio == text.encode() for audio, _ in results)
+    assert sorted(metadata['coalesced'] for _, metadata in results) == [False] + [True] * (CALLERS - 1)
+    assert processor._inflight_tts == {}
+
+def test_followers_receive_the_leaders_error():
+    """Test that a failed request is reported to every waiting caller and then cleared."""
+    processor = make_processor(error=RuntimeError("rate limited"))
+    text = f"Please hold {uuid.uuid4()}"
+
+    results = synthesize_concurrently(processor, text)
+
+    assert processor.tts_client.calls == 1
+    assert results == [(b"", {"error": "rate limited"})] * CALLERS
+    assert processor._inflight_tts == {}